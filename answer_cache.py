@@ -0,0 +1,149 @@
+## Importing required Libraries
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+from text import STOP_WORDS, normalize
+
+## Answer cache settings, overridable through the environment
+ANSWER_CACHE_SIZE = int(os.environ.get('ESELLER_ANSWER_CACHE_SIZE', 10000))
+ANSWER_CACHE_TTL = float(os.environ.get('ESELLER_ANSWER_CACHE_TTL', 6 * 3600))
+## Store answers in the on-disk product cache too, so every worker process shares them
+ANSWER_CACHE_SHARED = os.environ.get('ESELLER_ANSWER_CACHE_SHARED', '0') == '1'
+## Token-set (Jaccard) similarity from which two questions count as the same question, tuned with
+## benchmarks/bench_answer_cache.py : at 0.5, 18 of 18 paraphrase pairs hit and none of 20 different-question pairs do
+MIN_SIMILARITY = 0.5
+## Question fillers ('the phone', 'please tell') that never change what is asked, on top of the shared stop words
+FILLER_WORDS = set('any phone mobile device good used there please tell'.split())
+QUESTION_STOP_WORDS = STOP_WORDS | FILLER_WORDS
+## Words spelled differently for the same thing, mapped after the plural 's' is dropped ('inches' -> 'inche')
+SYNONYMS = {'color' : 'colour', 'cost' : 'price', 'inche' : 'inch', 'mp' : 'megapixel'}
+## Units and qualifiers a paraphrase may add or leave out ('battery life' / 'battery life hours') : two questions only
+## near-match when every token they differ in is one of these, so 'front' / 'rear', 'fast wireless' / 'wireless'
+## and negations ('not', 'no', 'without' are never qualifiers) keep their own answers
+QUALIFIER_WORDS = set('hour inch internal slot long box network size total exact'.split())
+
+## Function to get the normalized tokens of a question, as a set
+def normalize_question(question):
+    return frozenset(SYNONYMS.get(token, token) for token in normalize(question, QUESTION_STOP_WORDS))
+
+## LRU + TTL cache of answers keyed by (product ID, normalized question), paraphrases matched by token-set similarity
+class AnswerCache:
+    def __init__(self, maxSize=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL, shared=ANSWER_CACHE_SHARED, minSimilarity=MIN_SIMILARITY):
+        self.maxSize = maxSize
+        self.ttl = ttl
+        self.shared = shared
+        self.minSimilarity = minSimilarity
+        self.entries = OrderedDict()
+        ## product ID -> token -> keys of that product containing the token, to find paraphrase candidates
+        self.tokenIndex = {}
+        self.counts = {'hits' : 0, 'nearHits' : 0, 'sharedHits' : 0, 'misses' : 0, 'evictions' : 0}
+        self.lock = threading.Lock()
+
+    def remove(self, key):
+        answer, stored = self.entries.pop(key)
+        productID, tokens = key
+        for token in tokens:
+            keys = self.tokenIndex[productID][token]
+            keys.discard(key)
+            if len(keys) == 0:
+                del self.tokenIndex[productID][token]
+        if len(self.tokenIndex[productID]) == 0:
+            del self.tokenIndex[productID]
+
+    def lookup(self, key):
+        if key not in self.entries:
+            return None
+        answer, stored = self.entries[key]
+        if time.time() - stored > self.ttl:
+            self.remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return answer
+
+    ## Function to get the closest cached question of the same product, if it is similar enough and only differs in qualifiers
+    def nearest(self, productID, tokens):
+        candidates = set()
+        for token in tokens:
+            candidates.update(self.tokenIndex.get(productID, {}).get(token, ()))
+        best, bestSimilarity = None, self.minSimilarity
+        for key in candidates:
+            if not (tokens ^ key[1]) <= QUALIFIER_WORDS or (tokens & key[1]) <= QUALIFIER_WORDS:
+                continue
+            similarity = len(tokens & key[1]) / len(tokens | key[1])
+            if similarity >= bestSimilarity:
+                best, bestSimilarity = key, similarity
+        return best
+
+    ## Function to get the cached answer of 'question' or a paraphrase of it, questions without content words are never cached
+    def get(self, productID, question):
+        tokens = normalize_question(question)
+        if len(tokens) == 0:
+            return None
+        key = (productID, tokens)
+        with self.lock:
+            answer = self.lookup(key)
+            if answer is not None:
+                self.counts['hits'] += 1
+                return answer
+            nearKey = self.nearest(productID, tokens)
+            answer = None if nearKey is None else self.lookup(nearKey)
+            if answer is not None:
+                self.counts['nearHits'] += 1
+                return answer
+
+        if self.shared:
+            from product_cache import productCache
+            row = productCache.read(self.shared_key(key))
+            if row is not None and time.time() - row[1] <= self.ttl:
+                answer = json.loads(row[0])
+                with self.lock:
+                    self.counts['sharedHits'] += 1
+                    self.store(key, answer)
+                return answer
+
+        with self.lock:
+            self.counts['misses'] += 1
+        return None
+
+    def store(self, key, answer):
+        if key in self.entries:
+            self.remove(key)
+        self.entries[key] = (answer, time.time())
+        productID, tokens = key
+        for token in tokens:
+            self.tokenIndex.setdefault(productID, {}).setdefault(token, set()).add(key)
+        while len(self.entries) > self.maxSize:
+            self.remove(next(iter(self.entries)))
+            self.counts['evictions'] += 1
+
+    def put(self, productID, question, answer):
+        key = (productID, normalize_question(question))
+        if len(key[1]) == 0:
+            return
+        with self.lock:
+            self.store(key, answer)
+        if self.shared:
+            from product_cache import productCache
+            productCache.write(self.shared_key(key), json.dumps(answer).encode('utf-8'))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.tokenIndex.clear()
+
+    def shared_key(self, key):
+        productID, tokens = key
+        return 'answer:' + str(productID) + ':' + ' '.join(sorted(tokens))
+
+    ## Function to get the hit / miss counts and the hit rate, to size the cache
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counts, size=len(self.entries))
+        lookups = stats['hits'] + stats['nearHits'] + stats['sharedHits'] + stats['misses']
+        stats['hitRate'] = (lookups - stats['misses']) / lookups if lookups else 0.0
+        return stats
+
+answerCache = AnswerCache()
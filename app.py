@@ -1,261 +1,19 @@
 ## Importing required Libraries
+## The ML stack (TensorFlow, torch, transformers, pyarrow, ...) is imported only once a product link is submitted,
+## so the landing page renders without it
 import streamlit as st
 
-import numpy as np
-import pandas as pd
-import requests
-import json
 import re
-from bs4 import BeautifulSoup as bs
 
-from tensorflow.python.keras import models, layers, optimizers
-import tensorflow
-from tensorflow.keras.preprocessing.text import Tokenizer, text_to_word_sequence
-from tensorflow.keras.preprocessing.sequence import pad_sequences
-import pickle
-
-from transformers import DistilBertForQuestionAnswering
-from transformers import DistilBertTokenizer
-from textblob import TextBlob
-import torch
-import textwrap
-
-## storing models into cache
-@st.cache(ttl = 3600)
-def load_model( ):
-    return DistilBertForQuestionAnswering.from_pretrained('distilbert-base-uncased-distilled-squad')
-
-@st.cache(ttl = 3600)
-def load_tokenizer( ):
-    return DistilBertTokenizer.from_pretrained('distilbert-base-uncased',return_token_type_ids = True)
-
-## Function to answer the 'question' based on the given 'context'
-def qna_bert(context, question):
-    model = load_model()
-    tokenizer = load_tokenizer()
-        
-    def check_spelling(question):
-        question = re.sub(r'[^\w\s]', '', question)
-        question = question.lower()
-        question_list = question.split()
-
-        for i in range(len(question_list)):
-            question_list[i] = str( TextBlob(question_list[i]).correct() )
-        
-        question = " ".join(question_list)
-        return (question + " ?")
-
-    def answer_question(question, answer_text):
-        encoding = tokenizer.encode_plus(question, answer_text)
-        input_ids, attention_mask = encoding["input_ids"], encoding["attention_mask"]
-
-        outputs = model(torch.tensor([input_ids]), attention_mask=torch.tensor([attention_mask]))
-        start_scores = outputs.start_logits
-        end_scores = outputs.end_logits
-
-        ans_tokens = input_ids[torch.argmax(start_scores) : torch.argmax(end_scores)+1]
-        answer_tokens = tokenizer.convert_ids_to_tokens(ans_tokens , skip_special_tokens=True)
-
-        answer_tokens_to_string = tokenizer.convert_tokens_to_string(answer_tokens)
-
-        return answer_tokens_to_string
-
-    context = context
-    question = check_spelling(question)
-    answer = answer_question(question, context)
-
-    return {'context': context, 'question' : question, 'answer' : answer}
-
-## Function to Scrape product related data 
-def scrape_data(productURL):
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/78.0.3904.108 Safari/537.36", "Accept-Encoding":"gzip, deflate", "Accept":"text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8", "DNT":"1","Connection":"close", "Upgrade-Insecure-Requests":"1"}
-    productPage = requests.get(productURL, headers=headers)
-    productSoup = bs(productPage.content,'html.parser')
-    
-    # Product-Name
-    productNames = productSoup.find_all('span', id='productTitle')
-    if len(productNames) > 0:
-        productNames = productNames[0].get_text().strip()
-    
-    # Offer-Price
-    ids = ['priceblock_dealprice', 'priceblock_ourprice', 'tp_price_block_total_price_ww']
-    for ID in ids:
-        productDiscountPrice = productSoup.find_all('span', id=ID)
-        if len(productDiscountPrice) > 0 :
-            productDiscountPrice = productDiscountPrice[0].get_text().strip().split('.')[0]
-            productDiscountPrice = productDiscountPrice +'.00'
-            break
-    
-    # MRP-Price
-    classes = ['priceBlockStrikePriceString', 'a-text-price']
-    for CLASS in classes:
-        productActualPrice = productSoup.find_all('span', class_=CLASS)
-        if len(productActualPrice) > 0 :
-            productActualPrice = productActualPrice[0].get_text().strip().split('.')[0]
-            productActualPrice = productActualPrice + '.00'
-            break
-    
-    # Product-IMGs
-    productImg = productSoup.find_all('img', id="landingImage")
-    if len(productImg) > 0:
-        productImg = productImg[0]['data-a-dynamic-image']
-        productImg = json.loads(productImg)
-    
-    # Product-Rating
-    productRating = productSoup.find_all('span', class_="a-icon-alt")
-    if len(productRating) > 0:
-        productRating = productRating[0].get_text().strip()
-
-    # Product-Stars
-    productStars = productSoup.find_all('table', id="histogramTable")
-    if len(productStars) > 0:
-        productStars = productStars[0].get_text().replace('\n', '').split('%')
-        temp = []
-        for i in range(len(productStars)-1):
-            temp.append(float(productStars[i][-2:]))
-        productStars = temp
-    
-    # Product-Features
-    productFeatures = productSoup.find_all('div', id='feature-bullets')
-    if len(productFeatures) > 0:
-        productFeatures = productFeatures[0].get_text().strip()
-        productFeatures = re.split('\n|  ',productFeatures)
-        temp = []
-        for i in range(len(productFeatures)):
-            if productFeatures[i]!='' and productFeatures[i]!=' ' :
-                temp.append( productFeatures[i].strip() )
-        productFeatures = temp
-    
-    # Product-Specs
-    ids = { 'productDetails_techSpec_section_1' : 'table', 'detailBullets_feature_div' : 'div' }
-    for key, value in ids.items():
-        productSpecs = productSoup.find_all(value, id=key)
-        if len(productSpecs) > 0:
-            productSpecs = productSpecs[0].get_text().strip()
-            productSpecs = re.split('\n|\u200e|  ',productSpecs) 
-            temp = []
-            for i in range(len(productSpecs)):
-                if productSpecs[i]!='' and productSpecs[i]!=' ' :
-                    temp.append( productSpecs[i].strip() )
-            productSpecs = temp
-            break
-    
-    # Product-Details
-    ids = { 'productDetails_db_sections' : 'div' }
-    for key, value in ids.items():
-        productDetails = productSoup.find_all(value, id=key)
-        if len(productDetails) > 0:
-            productDetails = productDetails[0].get_text()
-            productDetails = re.split('\n|  ',productDetails) 
-            temp = []
-            for i in range(len(productDetails)):
-                if productDetails[i]!='' and productDetails[i]!=' ' :
-                    temp.append( productDetails[i].strip() )
-            productDetails = temp
-            break
-    
-    context1 = ''
-    for i in range(1, len(productFeatures)-1):
-        context1 = context1 + 'Product has ' + productFeatures[i].replace(' | ', ', ') + '. '
-    
-    context2 = ''
-    for i in range(0, len(productSpecs), 2):
-        context2 = context2 + productSpecs[i] + ' is ' + productSpecs[i+1] + '. '
-    
-    details = {
-        'product_data' : {
-            'productNames' : productNames,
-            'productDiscountPrice' : productDiscountPrice,
-            'productActualPrice' : productActualPrice,
-            'productRating' : productRating,
-            'productStars' : productStars,
-            'productImg' : productImg,
-            'productFeatures' : productFeatures,
-            'productSpecs' : productSpecs,
-            'productDetails' : productDetails,
-            'context1' : context1, 
-            'context2' : context2 
-        }
-    }
-    return details
+from registry import registry
 
 ## Helper Funtions
-def find_answer(answer1, answer2):
-    #print(answer1, type(answer1))
-    answer1 = answer1.split(' ')
-    answer2 = answer2.split(' ')
-    answer = []
-
-    for word in answer1:
-        if not (word in answer):
-            answer.append(word)
-    answer.append(',')
-    for word in answer2:
-        if not (word in answer):
-            answer.append(word)
-    
-    answer = " ".join(answer)
-    answer = answer.strip().strip(',')
-    return answer
-
 def getList(dict):
     list = []
     for key in dict.keys():
         list.append(key)
     return list
 
-## Function to Scrape product review data 
-def scrape_reviews( reviewsURL ):
-    headers_ = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/78.0.3904.108 Safari/537.36", "Accept-Encoding":"gzip, deflate", "Accept":"text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8", "DNT":"1","Connection":"close", "Upgrade-Insecure-Requests":"1"}
-    allReviewSoup_ = []
-    pageNo = 0
-    while 1 :
-        ## Look into all pages untill the page is empty
-        pageNo += 1
-        reviewsPage_ = requests.get(reviewsURL+'&pageNumber='+str(pageNo), headers=headers_)
-        reviewsSoup_ = bs(reviewsPage_.content,'html.parser')
-        names = reviewsSoup_.find_all('span',class_='a-profile-name')
-        if len(names)<=2 and pageNo>1:
-            break
-        else :
-            allReviewSoup_.append(reviewsSoup_)
-        
-    ## get reviews from all pages
-    cust_name = []
-    review_title = []
-    rate = []
-    review_content = []
-    for reviewsSoup in allReviewSoup_:
-        names = reviewsSoup.find_all('span',class_='a-profile-name')
-        for i in range(1,len(names)):
-            cust_name.append(names[i].get_text())
-        
-        title = reviewsSoup.find_all('a',class_='review-title-content')
-        
-        for i in range(0,len(title)):
-            review_title.append(title[i].get_text())
-        review_title[:] = [titles.lstrip('\n') for titles in review_title]
-        review_title[:] = [titles.rstrip('\n') for titles in review_title]
-
-        rating = reviewsSoup.find_all('i',class_='review-rating')
-        for i in range(0,len(rating)):
-            rate.append(int(rating[i].get_text()[0]))
-        
-        review = reviewsSoup.find_all("span",{"data-hook":"review-body"})
-        for i in range(0,len(review)):
-            review_content.append(review[i].get_text())
-        review_content[:] = [reviews.lstrip('\n') for reviews in review_content]
-        review_content[:] = [reviews.rstrip('\n') for reviews in review_content]
-
-    reviewDataset = pd.DataFrame()
-    reviewDataset['Customer Name'] = cust_name
-    reviewDataset['Review title']  = review_title
-    reviewDataset['Ratings']       = rate
-    reviewDataset['Reviews']       = review_content
-
-    return [reviewDataset, review_content]
-
-
 ### Streamlit app
 st.set_page_config(
     page_title="eSeller",
@@ -319,8 +77,13 @@ else :
     productURL = ''
 
 if(productURL != ''):
+    ## Load and warm all models once per process, in the background, while the product is scraped
+    registry.warm_up()
+    from product_cache import get_product_id, get_product, get_reviews
+
     ## Scrape data and show the data 
-    data = scrape_data(productURL)
+    productID = get_product_id(productURL)
+    data = get_product(productURL)
     product_title = (data['product_data']['productNames']).split( '(' )
     title = (product_title[0]).split('with')
     st.markdown( f'<h3 style="color:#F7CA00;"> <b>{title[0]}</b> </h3>', unsafe_allow_html=True)
@@ -375,30 +138,20 @@ if(productURL != ''):
 
         ## sentiment analysis
         if 'like' not in st.session_state:
-            reviews = scrape_reviews(productURL+'&reviewerType=all_reviews')
-            MAX_FEATURES = 12000
-            tokenizer = None
-            with open('tokenizer.pickle', 'rb') as handle:
-                tokenizer = pickle.load(handle)
-            
-            test_texts = tokenizer.texts_to_sequences(reviews[1])
-            test_texts = pad_sequences(test_texts, maxlen=255)
-            model = tensorflow.keras.models.load_model('sentimentAnalysisModel/')
-            preds = model.predict(test_texts)
-            preds = (1 * (preds >= 0.5))
-            for i in range(len(preds)):
-                if reviews[0]['Ratings'][i] > 3:
-                    preds[i] = 1
-            like  =  (sum(preds)/len(preds))*100
-            st.session_state['test_texts'] = test_texts
-            st.session_state['like'] = like
+            from sentiment import score_reviews, positive_share
+            from timing import stage
+            with stage('sentiment', productID=productID):
+                reviews = get_reviews(productURL)
+                preds = score_reviews(registry.get('sentiment_model'), registry.get('sentiment_tokenizer'), reviews.reviews, reviews.ratings)
+            st.session_state['reviewCount'] = len(preds)
+            st.session_state['like'] = positive_share(preds)
 
         st.markdown(f'''
         <div style="display: flex; flex-direction:row; justify-content: space-evenly;">
             <div class="card bg-dark text-white" style="width: 38rem; margin-top: 1rem; margin-bottom: 1rem;">
                 <div class="card-body">
-                    <h4 class="card-subtitle" style="display: flex; flex-direction:row; justify-content: space-evenly; color:#B33F40;"> <b style="color:#00C896;">🡅 {round(st.session_state['like'][0], 1)}%</b>  <b style="color:#B33F40;">🡇 {round(100.0-st.session_state['like'][0], 1)}%</b> </h4>
-                    <h5 class="card-subtitle" style="display: flex; flex-direction:row; justify-content: space-evenly; color:#F7CA00"><b>Sentiment Analysis results of all {len(st.session_state['test_texts'])-(len(st.session_state['test_texts'])%10)}+ Reviews</b></h5>
+                    <h4 class="card-subtitle" style="display: flex; flex-direction:row; justify-content: space-evenly; color:#B33F40;"> <b style="color:#00C896;">🡅 {round(st.session_state['like'], 1)}%</b>  <b style="color:#B33F40;">🡇 {round(100.0-st.session_state['like'], 1)}%</b> </h4>
+                    <h5 class="card-subtitle" style="display: flex; flex-direction:row; justify-content: space-evenly; color:#F7CA00"><b>Sentiment Analysis results of all {st.session_state['reviewCount']-(st.session_state['reviewCount']%10)}+ Reviews</b></h5>
                 </div>
             </div>
         </div>''', unsafe_allow_html=True)
@@ -406,10 +159,14 @@ if(productURL != ''):
         ## Q-A system
         question = st.text_input('', placeholder="Ask Anything ")
         if question != '':   
-            answer1 = qna_bert(data['product_data']['context1'], question)
-            answer2 = qna_bert(data['product_data']['context2'], question)
-            answer = find_answer(answer1['answer'], answer2['answer'])
-            st.success(answer)
+            from qna import qna_bert, product_contexts
+            from retrieval import get_passage_index, build_passage_index
+            from specs import get_attribute_index
+            contexts = product_contexts(data['product_data'])
+            passageIndex = get_passage_index(productID, lambda : build_passage_index(data['product_data'], get_reviews(productURL).reviews))
+            attributeIndex = get_attribute_index(productID, data['product_data'])
+            answer = qna_bert(contexts, question, productID, passageIndex, attributeIndex)
+            st.success(answer['answer'])
 else:
     st.markdown(f'''
         <h4 class="card-subtitle" style="display: flex; flex-direction:row; justify-content: space-evenly; color:#FFFFFF;"><b>Welcome to <span style="color:#F7CA00;"><a href="https://share.streamlit.io/aditya-r-chakole/eseller/main/app.py" style="color: inherit;">eSeller</a></span></b></h4>
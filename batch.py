@@ -0,0 +1,279 @@
+## Batch runner : sentiment and answers for a whole catalog, written incrementally and resumed after a restart
+## Products are scraped (or saved pages parsed) on a process pool, questions of several products share each forward pass
+## RUN : python batch.py products.jsonl --output answers.jsonl [--questions questions.txt] [--workers 4] [--batch-size 32]
+##   products.jsonl lines : {"id": "...", "url": "https://www.amazon.in/dp/..."} or {"html": "product.html", "reviews": "reviews/"},
+##   with an optional "questions" list ; CSV inputs have the same columns, with questions separated by '|'
+##   An output ending in .parquet is a directory of Parquet parts, anything else a JSON lines file
+import os
+import re
+import sys
+import csv
+import json
+import argparse
+import multiprocessing
+from itertools import islice
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pyarrow as pa
+
+BATCH_SIZE = 32
+PARQUET_PART_SIZE = 100
+## Products loaded ahead of the models per worker, bounds the memory of a large catalog
+PREFETCH_PER_WORKER = 4
+## Default worker count when jobs crawl live pages, every worker crawls the same host
+URL_WORKERS = 2
+
+## Columns of the Parquet output, failed products only have 'id' and 'error'
+OUTPUT_SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('productID', pa.string()),
+    ('productNames', pa.string()),
+    ('sentiment', pa.struct([('positive', pa.float64()), ('reviews', pa.int64())])),
+    ('answers', pa.list_(pa.struct([('question', pa.string()), ('answer', pa.string()), ('score', pa.float64()), ('context', pa.string())]))),
+    ('error', pa.string()),
+])
+
+## Function to get a value of a string column : the scraper's empty-list sentinel and other empty values become null
+def to_string(value):
+    if value is None or value == [] or value == '':
+        return None
+    return value if isinstance(value, str) else str(value)
+
+## Function to read the product jobs of a JSON lines or CSV file, every job gets an 'id' (its url or html path by default)
+def read_jobs(path, defaultQuestions=()):
+    with open(path, encoding='utf-8', newline='') as handle:
+        if path.endswith('.csv'):
+            rows = []
+            for row in csv.DictReader(handle):
+                row = {key : value for key, value in row.items() if value}
+                if 'questions' in row:
+                    row['questions'] = [question.strip() for question in row['questions'].split('|') if question.strip() != '']
+                rows.append(row)
+        else:
+            rows = [json.loads(line) for line in handle if line.strip() != '']
+
+    jobs = []
+    for row in rows:
+        if 'url' not in row and 'html' not in row:
+            raise ValueError(f'{path} : every product needs a "url" or an "html" file, got {row}')
+        row.setdefault('id', row.get('url') or row['html'])
+        row['questions'] = list(row.get('questions') or defaultQuestions)
+        jobs.append(row)
+    return jobs
+
+## Function to get the saved review page files of a job : a list of files, or a directory of reviews-<pageNo>.html pages
+def get_review_files(reviews):
+    if isinstance(reviews, list):
+        return reviews
+    pages = []
+    for name in os.listdir(reviews):
+        pageNo = re.fullmatch(r'reviews-(\d+)\.html', name)
+        if pageNo is not None:
+            pages.append((int(pageNo.group(1)), os.path.join(reviews, name)))
+    return [path for pageNo, path in sorted(pages)]
+
+## Function run once in every worker : its crawler shares the host limiter of the pool and gets a share of the per-host concurrency
+def init_worker(nextSlot, lock, concurrency):
+    import scraper
+    scraper.crawler = scraper.ReviewCrawler(concurrency=concurrency, limiter=scraper.HostLimiter(nextSlot=nextSlot, lock=lock))
+
+## Function run on the process pool : the product data and reviews of a job, from the cache / live pages or from saved pages
+def load_product(job):
+    try:
+        if 'html' in job:
+            from scraper import parse_product_page, parse_review_page
+            with open(job['html'], 'rb') as handle:
+                product_data = parse_product_page(handle.read())['product_data']
+            reviews = []
+            for path in get_review_files(job['reviews']) if 'reviews' in job else []:
+                with open(path, 'rb') as handle:
+                    reviews.extend(parse_review_page(handle.read()).reviews)
+            ## The job id (the html path by default) keys the answer and attribute caches, file names repeat across directories
+            productID = job.get('productID') or job['id']
+            return {'job' : job, 'productID' : productID, 'product_data' : product_data, 'reviews' : [review[3] for review in reviews], 'ratings' : [review[2] for review in reviews]}
+
+        from product_cache import get_product_id, get_product, get_reviews
+        reviewStore = get_reviews(job['url'])
+        return {'job' : job, 'productID' : get_product_id(job['url']), 'product_data' : get_product(job['url'])['product_data'], 'reviews' : reviewStore.reviews, 'ratings' : reviewStore.ratings}
+    except Exception as error:
+        return {'job' : job, 'error' : repr(error)}
+
+## Incremental JSON lines output, finished products are flushed as soon as they are written
+class JsonLinesWriter:
+    def __init__(self, path):
+        self.path = path
+
+    def done_ids(self):
+        if not os.path.exists(self.path):
+            return set()
+        done = set()
+        with open(self.path, encoding='utf-8') as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    ## A line cut short by a crash is redone
+                    continue
+                if 'error' not in record:
+                    done.add(record['id'])
+        return done
+
+    def __enter__(self):
+        self.handle = open(self.path, 'a', encoding='utf-8')
+        return self
+
+    def write(self, record):
+        self.handle.write(json.dumps(record) + '\n')
+        self.handle.flush()
+
+    def __exit__(self, *args):
+        self.handle.close()
+
+## Incremental Parquet output : a directory of part files, a new part every 'partSize' products
+class ParquetWriter:
+    def __init__(self, path, partSize=PARQUET_PART_SIZE):
+        self.path = path
+        self.partSize = partSize
+        self.records = []
+
+    ## Function to get the finished part files, in write order
+    def parts(self):
+        if not os.path.isdir(self.path):
+            return []
+        return [os.path.join(self.path, name) for name in sorted(os.listdir(self.path)) if re.fullmatch(r'part-\d+\.parquet', name)]
+
+    def done_ids(self):
+        import pyarrow.parquet as pq
+        done = set()
+        for part in self.parts():
+            table = pq.read_table(part, columns=['id', 'error'])
+            done.update(id for id, error in zip(table.column('id').to_pylist(), table.column('error').to_pylist()) if error is None)
+        return done
+
+    def __enter__(self):
+        os.makedirs(self.path, exist_ok=True)
+        return self
+
+    def write(self, record):
+        self.records.append(record)
+        if len(self.records) >= self.partSize:
+            self.flush()
+
+    def flush(self):
+        import pyarrow.parquet as pq
+        if len(self.records) == 0:
+            return
+        partName = f'part-{len(self.parts()):05d}.parquet'
+        ## Written under a hidden temporary name first (skipped by dataset readers and by parts()), so a crash never leaves half a part behind
+        tempPath = os.path.join(self.path, '_' + partName + '.tmp')
+        ## Built column by column (Table.from_pylist needs pyarrow 7, requirements pin 6)
+        columns = {name : [record.get(name) for record in self.records] for name in OUTPUT_SCHEMA.names}
+        for field in OUTPUT_SCHEMA:
+            if field.type == pa.string():
+                columns[field.name] = [to_string(value) for value in columns[field.name]]
+        pq.write_table(pa.Table.from_pydict(columns, schema=OUTPUT_SCHEMA), tempPath)
+        os.replace(tempPath, os.path.join(self.path, partName))
+        self.records = []
+
+    def __exit__(self, *args):
+        self.flush()
+
+## Batch runner : scores and answers the loaded products, questions of several products share each forward pass
+class BatchRunner:
+    def __init__(self, writer, batchSize=BATCH_SIZE, sentiment=True):
+        from registry import registry
+        self.registry = registry
+        self.writer = writer
+        self.batchSize = batchSize
+        self.sentiment = sentiment
+        self.products = []
+        self.questionCount = 0
+
+    def add(self, product):
+        if 'error' in product:
+            self.writer.write({'id' : product['job']['id'], 'error' : product['error']})
+            return
+        self.products.append(product)
+        self.questionCount += len(product['job']['questions'])
+        if self.questionCount >= self.batchSize:
+            self.flush()
+
+    def score_sentiment(self, product):
+        from sentiment import score_reviews, positive_share
+        preds = score_reviews(self.registry.get('sentiment_model'), self.registry.get('sentiment_tokenizer'), product['reviews'], product['ratings'])
+        return {'positive' : positive_share(preds), 'reviews' : len(preds)}
+
+    def flush(self):
+        from qna import qna_bert_batch, product_contexts
+        from retrieval import build_passage_index
+        from specs import build_attribute_index
+
+        items, owners = [], []
+        for productNo, product in enumerate(self.products):
+            contexts = product_contexts(product['product_data'])
+            passageIndex = build_passage_index(product['product_data'], product['reviews'])
+            attributeIndex = build_attribute_index(product['product_data'])
+            for question in product['job']['questions']:
+                items.append((contexts, question, product['productID'], passageIndex, attributeIndex))
+                owners.append(productNo)
+
+        answers = [[] for product in self.products]
+        for start in range(0, len(items), self.batchSize):
+            for productNo, (contexts, question, productID, passageIndex, attributeIndex), answer in zip(owners[start:start+self.batchSize], items[start:start+self.batchSize], qna_bert_batch(items[start:start+self.batchSize])):
+                answers[productNo].append({'question' : question, 'answer' : answer['answer'], 'score' : answer['score'], 'context' : answer['context']})
+
+        for product, productAnswers in zip(self.products, answers):
+            self.writer.write({
+                'id' : product['job']['id'],
+                'productID' : product['productID'],
+                'productNames' : to_string(product['product_data']['productNames']),
+                'sentiment' : self.score_sentiment(product) if self.sentiment else None,
+                'answers' : productAnswers,
+            })
+        self.products = []
+        self.questionCount = 0
+
+## Function to run every job not already in the output, 'workers' processes scraping / parsing ahead of the models
+def run(jobs, writer, workers=None, batchSize=BATCH_SIZE, sentiment=True):
+    done = writer.done_ids()
+    jobs = [job for job in jobs if job['id'] not in done]
+    print(f'{len(done)} products already done, {len(jobs)} to run', file=sys.stderr)
+
+    ## Live pages are crawled politely : a few workers by default, one request rate per host and the per-host concurrency split between them
+    from scraper import MAX_CONCURRENCY
+    workers = workers or (URL_WORKERS if any('url' in job for job in jobs) else os.cpu_count() or 1)
+    context = multiprocessing.get_context('spawn')
+
+    ## Spawned workers only import the scraper, never the models loaded in this process
+    with writer, context.Manager() as manager, ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker, initargs=(manager.dict(), manager.Lock(), max(1, MAX_CONCURRENCY // workers))) as pool:
+        runner = BatchRunner(writer, batchSize, sentiment)
+        ## At most 'PREFETCH_PER_WORKER' jobs per worker are submitted ahead of the models, results are taken in job order
+        jobIter = iter(jobs)
+        pending = deque(pool.submit(load_product, job) for job in islice(jobIter, workers * PREFETCH_PER_WORKER))
+        productNo = 0
+        while pending:
+            product = pending.popleft().result()
+            job = next(jobIter, None)
+            if job is not None:
+                pending.append(pool.submit(load_product, job))
+            runner.add(product)
+            productNo += 1
+            print(f'[{productNo}/{len(jobs)}] {product["job"]["id"]}' + (f' : {product["error"]}' if 'error' in product else ''), file=sys.stderr)
+        runner.flush()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('input', help='JSON lines or CSV file of products')
+    parser.add_argument('--output', required=True, help='JSON lines file, or a .parquet directory')
+    parser.add_argument('--questions', help='file with one question per line, asked for every product without its own questions')
+    parser.add_argument('--workers', type=int, default=None, help=f'scraping / parsing processes, {URL_WORKERS} when products have a url, one per core otherwise')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='questions per forward pass')
+    parser.add_argument('--no-sentiment', action='store_true', help='skip the review sentiment')
+    args = parser.parse_args()
+
+    defaultQuestions = []
+    if args.questions:
+        with open(args.questions, encoding='utf-8') as handle:
+            defaultQuestions = [line.strip() for line in handle if line.strip() != '']
+    writer = ParquetWriter(args.output) if args.output.endswith('.parquet') else JsonLinesWriter(args.output)
+    run(read_jobs(args.input, defaultQuestions), writer, args.workers, args.batch_size, not args.no_sentiment)
@@ -0,0 +1,76 @@
+## Benchmark : near-duplicate matching of the answer cache on paraphrase and different-question pairs,
+## the hit / false hit counts for a range of token-set similarity thresholds (MIN_SIMILARITY is set from this)
+## RUN : python benchmarks/bench_answer_cache.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from answer_cache import AnswerCache, normalize_question, MIN_SIMILARITY
+
+## Pairs of questions customers ask with the same meaning, the second should hit the answer of the first
+PARAPHRASES = [
+    ("battery life", "battery life hours"),
+    ("what is the battery life", "how many hours is the battery life"),
+    ("is it waterproof", "is the phone waterproof"),
+    ("does it support fast charging", "does the phone support fast charging"),
+    ("what is the screen size", "what is the size of the screen"),
+    ("what is the screen size", "screen size in inches"),
+    ("how much storage does it have", "how much internal storage"),
+    ("which processor does it have", "which processor is used"),
+    ("what is the weight", "what is the weight of the phone"),
+    ("how is the camera quality", "camera quality"),
+    ("does it have dual sim", "does the phone have dual sim slots"),
+    ("is there a warranty", "how long is the warranty"),
+    ("what colours are available", "which colours are available"),
+    ("does it have a headphone jack", "is there a headphone jack"),
+    ("how is the sound quality", "how good is the sound quality"),
+    ("is the charger included", "is a charger included in the box"),
+    ("does it support 5g", "does this phone support 5g network"),
+    ("what is the ram", "how much ram"),
+]
+## Pairs of close but different questions, the second must not get the answer of the first
+DIFFERENT = [
+    ("battery life", "battery capacity"),
+    ("is the battery removable", "battery life"),
+    ("what is the screen size", "what is the screen resolution"),
+    ("how is the camera quality", "how is the sound quality"),
+    ("what is the weight", "what is the weight of the charger"),
+    ("does it support fast charging", "does it support wireless charging"),
+    ("how much storage does it have", "can storage be expanded"),
+    ("is the charger included", "is the charger fast"),
+    ("does it have dual sim", "does it have dual camera"),
+    ("what is the ram", "what is the rom"),
+    ("is there a warranty", "is there a case included"),
+    ("front camera megapixels", "rear camera megapixels"),
+    ("does it support 5g", "does it support 4g volte"),
+    ("how is the display", "how is the display brightness outdoors"),
+    ("is it waterproof", "is it dustproof"),
+    ("does it have a headphone jack", "does it have a usb c port"),
+    ## Questions of 3-4 content words differing in one word, or in a negation
+    ("rear camera video resolution", "front camera video resolution"),
+    ("rear camera megapixels count", "front camera megapixels count"),
+    ("is the charger included", "is the charger not included"),
+    ("wireless charging", "does it support fast wireless charging"),
+]
+
+## Function to get the pairs whose second question hits the cached answer of the first
+def hits(pairs, minSimilarity):
+    found = []
+    for first, second in pairs:
+        cache = AnswerCache(shared=False, minSimilarity=minSimilarity)
+        cache.put('product', first, {'answer' : first})
+        if cache.get('product', second) is not None:
+            found.append((first, second))
+    return found
+
+if __name__ == '__main__':
+    print(f'{"threshold":>9} {"paraphrase hits":>16} {"false hits":>11}')
+    for minSimilarity in (0.34, 0.4, 0.5, 0.6, 0.67, 0.75, 1.0):
+        mark = '  <- MIN_SIMILARITY' if minSimilarity == MIN_SIMILARITY else ''
+        print(f'{minSimilarity:9.2f} {len(hits(PARAPHRASES, minSimilarity)):>10}/{len(PARAPHRASES):<5} {len(hits(DIFFERENT, minSimilarity)):>5}/{len(DIFFERENT):<5}{mark}')
+
+    missed = set(PARAPHRASES) - set(hits(PARAPHRASES, MIN_SIMILARITY))
+    for first, second in sorted(missed):
+        print(f'  missed : {first!r} / {second!r} ({sorted(normalize_question(first))} / {sorted(normalize_question(second))})')
+    for first, second in hits(DIFFERENT, MIN_SIMILARITY):
+        print(f'  false hit : {first!r} / {second!r}')
@@ -0,0 +1,77 @@
+## Benchmark : concurrent pooled, streaming review crawl against the old sequential crawl, on a local stub server
+## RUN : python benchmarks/bench_crawler.py [--reviews 300] [--latency 0.1] [--pages DIR]
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import requests
+from bs4 import BeautifulSoup as bs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scraper import ReviewCrawler, ReviewStore, HEADERS
+from fixtures import make_review_pages, load_review_pages, StubServer
+
+## The crawl loop scrape_reviews used before the pooled crawler
+def sequential_crawl(reviewsURL):
+    headers_ = dict(HEADERS, Connection='close')
+    allReviewSoup_ = []
+    pageNo = 0
+    while 1 :
+        pageNo += 1
+        reviewsPage_ = requests.get(reviewsURL+'&pageNumber='+str(pageNo), headers=headers_)
+        reviewsSoup_ = bs(reviewsPage_.content,'html.parser')
+        names = reviewsSoup_.find_all('span',class_='a-profile-name')
+        if len(names)<=2 and pageNo>1:
+            break
+        else :
+            allReviewSoup_.append(reviewsSoup_)
+    return allReviewSoup_
+
+## The streaming crawl : every page is reduced to records in the store as soon as it is fetched
+def streaming_crawl(crawler):
+    def crawl(reviewsURL):
+        reviewStore = ReviewStore()
+        pageCount = 0
+        for reviewsPage in crawler.crawl(reviewsURL):
+            reviewStore.append(reviewsPage.reviews)
+            pageCount += 1
+        return pageCount
+    return crawl
+
+def run(name, server, crawl):
+    reviewsURL = server.url + '/product-reviews/B000000000/?reviewerType=all_reviews'
+    del server.requests[:]
+    start = time.perf_counter()
+    pages = crawl(reviewsURL)
+    elapsed = time.perf_counter() - start
+    requestCount = len(server.requests)
+    pages = pages if isinstance(pages, int) else len(pages)
+
+    ## Second crawl under tracemalloc for the peak memory, tracing slows the parse down too much to time it
+    tracemalloc.start()
+    crawl(reviewsURL)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f'{name:<36} {elapsed:8.3f} s  {pages:4d} pages  {requestCount:4d} requests  {peak/2**20:8.1f} MiB peak')
+    return pages
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reviews', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.1)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--pages', help='directory of saved reviews-<n>.html pages')
+    args = parser.parse_args()
+
+    for withCount in (False, True):
+        reviewPages = load_review_pages(args.pages) if args.pages else make_review_pages(args.reviews, withCount=withCount)
+        with StubServer(reviewPages, latency=args.latency) as server:
+            print(f'-- {len(reviewPages)} review pages, {"with" if withCount else "without"} review count')
+            expected = run('sequential', server, sequential_crawl)
+            crawler = ReviewCrawler(concurrency=args.concurrency, minInterval=0)
+            assert run(f'pooled, concurrency={args.concurrency}', server, streaming_crawl(crawler)) == expected
+            crawler = ReviewCrawler(concurrency=args.concurrency)
+            assert run(f'pooled, concurrency={args.concurrency}, polite', server, streaming_crawl(crawler)) == expected
+        if args.pages:
+            break
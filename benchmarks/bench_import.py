@@ -0,0 +1,70 @@
+## Benchmark : import time of everything app.py imports before the landing page renders (python -X importtime)
+## Fails when the app's own modules pull a heavy module into that path, or when --budget seconds are exceeded
+## Heavy modules the framework (streamlit) imports by itself are not the app's doing and are only reported
+## RUN : python benchmarks/bench_import.py [--budget 2.0]
+import os
+import sys
+import ast
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ['tensorflow', 'torch', 'transformers', 'pandas', 'numpy', 'pyarrow', 'textblob', 'nltk', 'bs4', 'requests']
+
+## Function to get the modules app.py imports at its top level
+def top_level_imports(path):
+    with open(path, encoding='utf-8') as handle:
+        tree = ast.parse(handle.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            modules.append(node.module)
+    return modules
+
+## Function to get the names of the modules loaded after importing 'modules', and the importtime output
+def import_modules(modules):
+    code = f'import sys; import {", ".join(modules)}; print(" ".join(sorted(sys.modules)))'
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return set(result.stdout.split()), result.stderr
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--budget', type=float, help='maximum seconds for the landing page imports')
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    modules = top_level_imports(os.path.join(ROOT, 'app.py'))
+    loaded, importTimes = import_modules(modules)
+    ## The same imports without the repo's own modules : what the framework loads anyway
+    frameworkModules = [module for module in modules if not os.path.exists(os.path.join(ROOT, module.split('.')[0] + '.py'))]
+    frameworkLoaded = import_modules(frameworkModules)[0] if frameworkModules else set()
+
+    ## importtime lines : "import time: self [us] | cumulative | imported package"
+    timings = []
+    for line in importTimes.splitlines():
+        if line.startswith('import time:') and '|' in line and 'self [us]' not in line:
+            self_, cumulative, name = line[len('import time:'):].split('|')
+            timings.append((int(cumulative), name[1:].rstrip()))
+    ## Nested imports are indented under the module importing them, only top-level ones add up ('site' is interpreter startup)
+    total = sum(cumulative for cumulative, name in timings if not name.startswith(' ') and name != 'site')
+
+    heavy = [module for module in HEAVY if module in loaded and module not in frameworkLoaded]
+    frameworkHeavy = [module for module in HEAVY if module in frameworkLoaded]
+
+    print(f'landing page imports : {", ".join(modules)}')
+    print(f'total import time    : {total/1e6:.3f} s')
+    if frameworkHeavy:
+        print(f'heavy modules the framework ({", ".join(frameworkModules)}) imports itself : {", ".join(frameworkHeavy)}')
+    for cumulative, name in sorted(timings, reverse=True)[:args.top]:
+        print(f'  {cumulative/1e3:10.1f} ms  {name.strip()}')
+
+    failed = False
+    if heavy:
+        print(f'FAIL : heavy modules the app imports before the landing page : {", ".join(heavy)}')
+        failed = True
+    if args.budget is not None and total/1e6 > args.budget:
+        print(f'FAIL : {total/1e6:.3f} s is over the {args.budget:.3f} s budget')
+        failed = True
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,123 @@
+## Benchmark : the full pipeline (product scrape, review crawl, sentiment, question answering) replayed offline
+## from saved or synthetic pages on a local stub server, reported per instrumented stage
+## With --baseline, stages whose p50 grew past --tolerance times the baseline are listed and the exit status is 1
+## RUN : python benchmarks/bench_pipeline.py [--pages DIR] [--questions FILE] [--output timings.json] [--baseline timings.json]
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from registry import registry
+from timing import recorder
+from scraper import scrape_data, scrape_reviews
+from qna import qna_bert, product_contexts
+from answer_cache import answerCache
+from retrieval import build_passage_index
+from specs import build_attribute_index
+from fixtures import product_page, make_review_pages, load_product_pages, load_review_pages, tiny_qna_model, StubServer
+
+QUESTIONS = [
+    "what is the batery life",
+    "is it waterproof",
+    "what is the weight",
+    "which processor does it have",
+    "how much storage does it have",
+    "what is the screen size",
+    "does it support fast charging",
+    "what is the colour",
+    "how is the sound quality",
+    "is the camera good in low light",
+]
+PRODUCT_ID = 'B09VCBGWFZ'
+
+## Function to use a small local QnA model whose vocabulary covers the product and questions, when no pretrained one is asked for
+def register_tiny_model(texts):
+    model, tokenizer = tiny_qna_model(tempfile.mkdtemp(), texts)
+    registry.register('qna_tokenizer', lambda : tokenizer)
+    registry.register('qna_model', lambda : model)
+
+def run_product(server, questions, repeat):
+    data = scrape_data(server.url + '/dp/' + PRODUCT_ID)
+    reviews = scrape_reviews(server.url + '/product-reviews/' + PRODUCT_ID + '/?reviewerType=all_reviews')
+
+    try:
+        from sentiment import score_reviews
+        score_reviews(registry.get('sentiment_model'), registry.get('sentiment_tokenizer'), reviews.reviews, reviews.ratings)
+    except (RuntimeError, ImportError) as error:
+        print(f'sentiment skipped : {error}')
+
+    contexts = product_contexts(data['product_data'])
+    passageIndex = build_passage_index(data['product_data'], reviews.reviews)
+    attributeIndex = build_attribute_index(data['product_data'])
+    for _ in range(repeat):
+        ## Every round reaches the model, the answer cache would otherwise answer all rounds but the first
+        answerCache.clear()
+        for question in questions:
+            qna_bert(contexts, question, PRODUCT_ID, passageIndex, attributeIndex)
+
+def print_summary(summary):
+    print(f'{"stage":<28} {"count":>6} {"p50 ms":>10} {"p95 ms":>10} {"total ms":>10} {"max RSS +MiB":>13}')
+    for name, stats in summary.items():
+        rss = '-' if stats['maxRssDeltaBytes'] is None else f'{stats["maxRssDeltaBytes"]/2**20:.1f}'
+        print(f'{name:<28} {stats["count"]:6d} {stats["p50Seconds"]*1000:10.2f} {stats["p95Seconds"]*1000:10.2f} {stats["totalSeconds"]*1000:10.1f} {rss:>13}')
+
+## Function to get the stages whose p50 is more than 'tolerance' times their baseline p50
+def find_regressions(summary, baseline, tolerance):
+    regressions = []
+    for name, stats in summary.items():
+        if name in baseline and stats['p50Seconds'] > tolerance * baseline[name]['p50Seconds']:
+            regressions.append((name, baseline[name]['p50Seconds'], stats['p50Seconds']))
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', help='directory of saved product-<name>.html and reviews-<pageNo>.html pages')
+    parser.add_argument('--questions', help='file with one question per line')
+    parser.add_argument('--reviews', type=int, default=100, help='synthetic reviews when no saved review pages are given')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--pretrained', action='store_true', help='use the pretrained QnA model instead of a small local one')
+    parser.add_argument('--log', help='also write every record to this JSON lines file')
+    parser.add_argument('--output', help='write the per-stage summary to this JSON file')
+    parser.add_argument('--baseline', help='per-stage summary JSON of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=1.25)
+    args = parser.parse_args()
+
+    productPages = load_product_pages(args.pages) if args.pages else {'synthetic' : product_page()}
+    reviewPages = load_review_pages(args.pages) if args.pages else []
+    if len(reviewPages) == 0:
+        reviewPages = make_review_pages(args.reviews, withCount=True)
+    questions = QUESTIONS
+    if args.questions:
+        with open(args.questions, encoding='utf-8') as handle:
+            questions = [line.strip() for line in handle if line.strip() != '']
+
+    warmUp = True
+    for name, productPage in productPages.items():
+        with StubServer(reviewPages, productPage) as server:
+            if warmUp:
+                if not args.pretrained:
+                    register_tiny_model(product_contexts(scrape_data(server.url + '/dp/' + PRODUCT_ID)['product_data']) + questions)
+                ## One untimed pass, so model loading and the spelling index build are not measured
+                registry.get('spelling_index')
+                run_product(server, questions[:1], 1)
+                recorder.clear()
+                warmUp = False
+            print(f'-- {name} : {len(reviewPages)} review pages, {len(questions)} questions x {args.repeat}')
+            run_product(server, questions, args.repeat)
+
+    if args.log:
+        recorder.export_json(args.log)
+    summary = recorder.summary()
+    print_summary(summary)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(summary, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as handle:
+            regressions = find_regressions(summary, json.load(handle), args.tolerance)
+        for name, before, after in regressions:
+            print(f'REGRESSION {name} : p50 {before*1000:.2f} ms -> {after*1000:.2f} ms')
+        sys.exit(1 if len(regressions) > 0 else 0)
@@ -0,0 +1,91 @@
+## Benchmark : fp32 against dynamically quantized (int8) QnA model, latency, weight memory and exact-match / F1
+## Offline it uses a small randomly initialized model, so accuracy against the gold answers is meaningless there
+## and the agreement of int8 with fp32 is the number to watch; pass --model to measure the pretrained weights
+## RUN : python benchmarks/bench_quantization.py [--model distilbert-base-uncased-distilled-squad] [--threads 4] [--repeat 5]
+import os
+import re
+import sys
+import copy
+import time
+import string
+import argparse
+import tempfile
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from registry import model_bytes, prepare_qna_model, set_torch_threads
+from qna import encode_context, answer_questions
+from fixtures import QA_TRIPLES, tiny_qna_model
+
+## SQuAD answer normalization : lowercase, no punctuation, no articles, single spaces
+def normalize_answer(text):
+    text = ''.join(char for char in text.lower() if char not in string.punctuation)
+    return ' '.join(re.sub(r'\b(a|an|the)\b', ' ', text).split())
+
+def exact_match(prediction, truth):
+    return float(normalize_answer(prediction) == normalize_answer(truth))
+
+def f1_score(prediction, truth):
+    predictionTokens = normalize_answer(prediction).split()
+    truthTokens = normalize_answer(truth).split()
+    common = sum((Counter(predictionTokens) & Counter(truthTokens)).values())
+    if len(predictionTokens) == 0 or len(truthTokens) == 0:
+        return float(predictionTokens == truthTokens)
+    if common == 0:
+        return 0.0
+    precision, recall = common / len(predictionTokens), common / len(truthTokens)
+    return 2 * precision * recall / (precision + recall)
+
+## Function to get the answers and the median ms/question of answering every triple on its own, like the app does
+def run(model, tokenizer, items, repeat):
+    answer_questions(model, tokenizer, items[:1])
+    timings = []
+    for _ in range(repeat):
+        for item in items:
+            start = time.perf_counter()
+            answer_questions(model, tokenizer, [item])
+            timings.append(time.perf_counter() - start)
+    answers = [answer['answer'] for answer in answer_questions(model, tokenizer, items)]
+    return answers, sorted(timings)[len(timings)//2] * 1000
+
+def score(predictions, truths):
+    exact = sum(exact_match(p, t) for p, t in zip(predictions, truths)) / len(truths)
+    f1 = sum(f1_score(p, t) for p, t in zip(predictions, truths)) / len(truths)
+    return exact * 100, f1 * 100
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', help='pretrained QnA model name or path, a small local model is built otherwise')
+    parser.add_argument('--tokenizer', default='distilbert-base-uncased')
+    parser.add_argument('--dim', type=int, default=256, help='hidden size of the local model')
+    parser.add_argument('--layers', type=int, default=4, help='transformer layers of the local model')
+    parser.add_argument('--threads', type=int, default=0)
+    parser.add_argument('--interop-threads', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    set_torch_threads(args.threads, args.interop_threads)
+    if args.model:
+        from transformers import DistilBertForQuestionAnswering, DistilBertTokenizerFast
+        fp32 = DistilBertForQuestionAnswering.from_pretrained(args.model).eval()
+        tokenizer = DistilBertTokenizerFast.from_pretrained(args.tokenizer)
+    else:
+        directory = tempfile.mkdtemp()
+        fp32, tokenizer = tiny_qna_model(directory, [context + ' ' + question for context, question, answer in QA_TRIPLES], args.dim, args.layers)
+    int8 = prepare_qna_model(copy.deepcopy(fp32), 'int8')
+
+    import torch
+    print(f'torch threads : {torch.get_num_threads()} intra-op, {torch.get_num_interop_threads()} inter-op')
+    items = [(question, [encode_context(tokenizer, context)]) for context, question, answer in QA_TRIPLES]
+    truths = [answer for context, question, answer in QA_TRIPLES]
+
+    results = {}
+    print(f'{"backend":<8} {"ms/question":>12} {"weights MiB":>12} {"EM":>7} {"F1":>7}')
+    for name, model in [('fp32', fp32), ('int8', int8)]:
+        answers, latency = run(model, tokenizer, items, args.repeat)
+        exact, f1 = score(answers, truths)
+        results[name] = answers
+        print(f'{name:<8} {latency:12.2f} {model_bytes(model)/2**20:12.1f} {exact:7.1f} {f1:7.1f}')
+
+    exact, f1 = score(results['int8'], results['fp32'])
+    print(f'int8 agreement with fp32 : EM {exact:.1f} F1 {f1:.1f}')
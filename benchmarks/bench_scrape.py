@@ -0,0 +1,140 @@
+## Benchmark : single-pass strained product page extraction against the old full-tree find_all scans
+## RUN : python benchmarks/bench_scrape.py [--filler 3000] [--pages DIR]
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from bs4 import BeautifulSoup as bs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scraper import parse_product_page
+from fixtures import product_page, load_product_pages
+
+## The full-tree extraction scrape_data used before parse_product_page, without the context strings
+def legacy_parse(productPage):
+    productSoup = bs(productPage,'html.parser')
+    
+    # Product-Name
+    productNames = productSoup.find_all('span', id='productTitle')
+    if len(productNames) > 0:
+        productNames = productNames[0].get_text().strip()
+    
+    # Offer-Price
+    ids = ['priceblock_dealprice', 'priceblock_ourprice', 'tp_price_block_total_price_ww']
+    for ID in ids:
+        productDiscountPrice = productSoup.find_all('span', id=ID)
+        if len(productDiscountPrice) > 0 :
+            productDiscountPrice = productDiscountPrice[0].get_text().strip().split('.')[0]
+            productDiscountPrice = productDiscountPrice +'.00'
+            break
+    
+    # MRP-Price
+    classes = ['priceBlockStrikePriceString', 'a-text-price']
+    for CLASS in classes:
+        productActualPrice = productSoup.find_all('span', class_=CLASS)
+        if len(productActualPrice) > 0 :
+            productActualPrice = productActualPrice[0].get_text().strip().split('.')[0]
+            productActualPrice = productActualPrice + '.00'
+            break
+    
+    # Product-IMGs
+    productImg = productSoup.find_all('img', id="landingImage")
+    if len(productImg) > 0:
+        productImg = productImg[0]['data-a-dynamic-image']
+        productImg = json.loads(productImg)
+    
+    # Product-Rating
+    productRating = productSoup.find_all('span', class_="a-icon-alt")
+    if len(productRating) > 0:
+        productRating = productRating[0].get_text().strip()
+
+    # Product-Stars
+    productStars = productSoup.find_all('table', id="histogramTable")
+    if len(productStars) > 0:
+        productStars = productStars[0].get_text().replace('\n', '').split('%')
+        temp = []
+        for i in range(len(productStars)-1):
+            temp.append(float(productStars[i][-2:]))
+        productStars = temp
+    
+    # Product-Features
+    productFeatures = productSoup.find_all('div', id='feature-bullets')
+    if len(productFeatures) > 0:
+        productFeatures = productFeatures[0].get_text().strip()
+        productFeatures = re.split('\n|  ',productFeatures)
+        temp = []
+        for i in range(len(productFeatures)):
+            if productFeatures[i]!='' and productFeatures[i]!=' ' :
+                temp.append( productFeatures[i].strip() )
+        productFeatures = temp
+    
+    # Product-Specs
+    ids = { 'productDetails_techSpec_section_1' : 'table', 'detailBullets_feature_div' : 'div' }
+    for key, value in ids.items():
+        productSpecs = productSoup.find_all(value, id=key)
+        if len(productSpecs) > 0:
+            productSpecs = productSpecs[0].get_text().strip()
+            productSpecs = re.split('\n|\u200e|  ',productSpecs) 
+            temp = []
+            for i in range(len(productSpecs)):
+                if productSpecs[i]!='' and productSpecs[i]!=' ' :
+                    temp.append( productSpecs[i].strip() )
+            productSpecs = temp
+            break
+    
+    # Product-Details
+    ids = { 'productDetails_db_sections' : 'div' }
+    for key, value in ids.items():
+        productDetails = productSoup.find_all(value, id=key)
+        if len(productDetails) > 0:
+            productDetails = productDetails[0].get_text()
+            productDetails = re.split('\n|  ',productDetails) 
+            temp = []
+            for i in range(len(productDetails)):
+                if productDetails[i]!='' and productDetails[i]!=' ' :
+                    temp.append( productDetails[i].strip() )
+            productDetails = temp
+            break
+
+    return {
+        'productNames' : productNames,
+        'productDiscountPrice' : productDiscountPrice,
+        'productActualPrice' : productActualPrice,
+        'productRating' : productRating,
+        'productStars' : productStars,
+        'productImg' : productImg,
+        'productFeatures' : productFeatures,
+        'productSpecs' : productSpecs,
+        'productDetails' : productDetails,
+    }
+
+def run(name, parse, page, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = parse(page)
+    elapsed = (time.perf_counter() - start) / repeat
+    tracemalloc.start()
+    parse(page)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f'  {name:<12} {elapsed*1000:9.1f} ms  {peak/2**20:8.1f} MiB peak')
+    return result
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--filler', type=int, default=3000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--pages', help='directory of saved product-<name>.html pages')
+    args = parser.parse_args()
+
+    pages = load_product_pages(args.pages) if args.pages else {'synthetic': product_page(args.filler)}
+    for name, page in pages.items():
+        print(f'-- {name} ({len(page)/2**20:.1f} MiB)')
+        expected = run('full tree', legacy_parse, page, args.repeat)
+        result = run('single pass', parse_product_page, page, args.repeat)['product_data']
+        for key, value in expected.items():
+            if json.dumps(value) != json.dumps(result[key]):
+                print(f'  MISMATCH {key}: {value!r} != {result[key]!r}')
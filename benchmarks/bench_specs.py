@@ -0,0 +1,66 @@
+## Benchmark : spec questions answered from the attribute index on every fixture page layout (tech-spec table,
+## detail bullets, details with multi-line values), with the lookup latency ; wrong answers fail the run
+## RUN : python benchmarks/bench_specs.py [--pages DIR]
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scraper import parse_product_page
+from specs import build_attribute_index
+from fixtures import product_page, load_product_pages, PRODUCT_DETAILS, MULTI_LINE_DETAILS
+
+## (question, expected spec value) pairs, None when the question must go to the model
+QUESTIONS = [
+    ("what is the weight", "150 g"),
+    ("what is the item weight", "150 g"),
+    ("what is the colour", "Blue"),
+    ("who is the manufacturer", "HMD Global"),
+    ("what is the brand", "Nokia"),
+    ("what is the display size", "5.45 Inches"),
+    ("HMD Global", None),
+    ("C01 Plus", None),
+    ("is it made in india", None),
+    ("how is the camera quality", None),
+]
+## Questions only the multi-line details answer
+MULTI_LINE_QUESTIONS = [
+    ("what is the country of origin", "India"),
+    ("who is the packer", "HMD Global, Noida"),
+]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', help='directory of saved product-<name>.html pages, looked up without expected answers')
+    parser.add_argument('--repeat', type=int, default=1000)
+    args = parser.parse_args()
+
+    pages = {
+        'table' : (product_page(100), QUESTIONS),
+        'bullets' : (product_page(100, layout='bullets'), QUESTIONS),
+        'table, multi-line details' : (product_page(100, details=MULTI_LINE_DETAILS), QUESTIONS + MULTI_LINE_QUESTIONS),
+        'bullets, multi-line details' : (product_page(100, layout='bullets', details=MULTI_LINE_DETAILS), QUESTIONS + MULTI_LINE_QUESTIONS),
+    }
+    if args.pages:
+        for name, page in load_product_pages(args.pages).items():
+            pages[name] = (page, [(question, ...) for question, expected in QUESTIONS + MULTI_LINE_QUESTIONS])
+
+    failed = False
+    for name, (page, questions) in pages.items():
+        attributeIndex = build_attribute_index(parse_product_page(page)['product_data'])
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for question, expected in questions:
+                attributeIndex.lookup(question)
+        elapsed = (time.perf_counter() - start) / (args.repeat * len(questions))
+        print(f'-- {name} : {len(attributeIndex.keys)} keys, {elapsed*1e6:.1f} us/lookup')
+        for question, expected in questions:
+            attribute = attributeIndex.lookup(question)
+            answer = None if attribute is None else attribute['answer']
+            if expected is ...:
+                print(f'  {question!r} -> {answer!r}')
+            elif answer != expected:
+                print(f'  FAIL {question!r} -> {answer!r}, expected {expected!r}')
+                failed = True
+    sys.exit(1 if failed else 0)
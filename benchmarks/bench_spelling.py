@@ -0,0 +1,51 @@
+## Benchmark : indexed SymSpell corrector against the per-word TextBlob correction it replaced
+## RUN : python benchmarks/bench_spelling.py
+import os
+import sys
+import time
+from textblob import TextBlob
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from spelling import get_base_index, SpellCorrector
+
+QUESTIONS = [
+    "what is the batery life",
+    "is it waterprof",
+    "does it suport fast chargng",
+    "what is the wieght of the product",
+    "how many colours are availble",
+    "is there a warrenty",
+    "does the nokia c01 have dual sim",
+    "what is the screen sise",
+    "can i use it with my laptpo",
+    "is bluetooth supportd",
+]
+PRODUCT_TEXTS = ["Product has Unisoc SC9863A octa-core processor, 2GB RAM and 16GB storage. Product has Nokia C01 Plus with HD+ screen."]
+
+def textblob_correct(question):
+    return " ".join(str(TextBlob(word).correct()) for word in question.split())
+
+def run(name, correct, repeat):
+    results = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = [correct(question) for question in QUESTIONS]
+    elapsed = (time.perf_counter() - start) / (repeat * len(QUESTIONS))
+    print(f'{name:<28} {elapsed*1000:10.3f} ms/question')
+    return results
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    index = get_base_index()
+    print(f'{"index build":<28} {(time.perf_counter()-start)*1000:10.3f} ms ({len(index.deletes)} deletes)')
+
+    expected = run('TextBlob', textblob_correct, 1)
+    cold = run('SymSpell (cold cache)', lambda question: SpellCorrector(index, ()).correct(question), 1)
+    corrector = SpellCorrector(index, ())
+    run('SymSpell (warm cache)', corrector.correct, 100)
+    seeded = run('SymSpell (product terms)', SpellCorrector(index, PRODUCT_TEXTS[0].lower().split()).correct, 1)
+
+    agreement = sum(a == b for a, b in zip(expected, cold)) / len(QUESTIONS)
+    print(f'agreement with TextBlob : {agreement*100:.0f}%')
+    for question, blob, symspell, product in zip(QUESTIONS, expected, cold, seeded):
+        print(f'  {question!r:40} TextBlob={blob!r} SymSpell={symspell!r} product={product!r}')
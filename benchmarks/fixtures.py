@@ -0,0 +1,177 @@
+## Saved or synthetic Amazon pages and a local stub HTTP server serving them, for offline benchmarks
+import os
+import re
+import random
+import threading
+import time
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+WORDS = "good bad battery sound quality value money product phone screen charger fast slow bass cable build design light heavy price delivery works great poor excellent average".split()
+
+## Function to build one Amazon-like review page holding 'reviews' (name, title, rating, body) tuples
+def review_page(reviews, reviewCount=None):
+    blocks = []
+    for name, title, rating, body in reviews:
+        blocks.append(f'''
+<div data-hook="review" class="a-section review aok-relative">
+  <div class="a-profile-content"><span class="a-profile-name">{name}</span></div>
+  <i data-hook="review-star-rating" class="a-icon a-icon-star a-star-{rating} review-rating"><span class="a-icon-alt">{rating}.0 out of 5 stars</span></i>
+  <a data-hook="review-title" class="a-size-base a-link-normal review-title a-color-base review-title-content a-text-bold" href="#">
+<span>{title}</span>
+</a>
+  <span data-hook="review-body" class="a-size-base review-text review-text-content">
+<span>{body}</span>
+</span>
+</div>''')
+    count = '' if reviewCount is None else f'<div data-hook="cr-filter-info-review-rating-count" class="a-row a-spacing-base a-size-base">{reviewCount*3:,} total ratings, {reviewCount:,} with reviews</div>'
+    return f'''<html><head><title>Amazon.in:Customer reviews</title></head><body>
+<div id="cm_cr-product_info"><span class="a-profile-name">Amazon Customer</span></div>
+{count}
+<div id="cm_cr-review_list" class="a-section a-spacing-none review-views celwidget">{"".join(blocks)}
+</div></body></html>'''
+
+## Function to build 'reviewCount' random reviews split into pages of 10
+def make_review_pages(reviewCount, seed=0, withCount=False):
+    rng = random.Random(seed)
+    reviews = []
+    for i in range(reviewCount):
+        body = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 200)))
+        reviews.append((f'Customer {i}', " ".join(rng.choice(WORDS) for _ in range(4)), rng.randint(1, 5), body))
+    return [review_page(reviews[i:i+10], reviewCount if withCount else None) for i in range(0, reviewCount, 10)]
+
+## Spec and details rows of the fixture product
+PRODUCT_SPECS = [('Brand', 'Nokia'), ('Model Name', 'C01 Plus'), ('Item Weight', '150 g'), ('Battery Power Rating', '3000 Milliamp Hours'), ('Colour', 'Blue'), ('Display Size', '5.45 Inches')]
+PRODUCT_DETAILS = [('ASIN', 'B09VCBGWFZ'), ('Date First Available', '1 April 2022'), ('Manufacturer', 'HMD Global'), ('Item part number', 'C01 Plus')]
+## Details rows as real pages have them, with values over several lines (rating and count, one line per rank)
+MULTI_LINE_DETAILS = [('ASIN', 'B09VCBGWFZ'),
+    ('Customer Reviews', '<span class="a-icon-alt">4.0 out of 5 stars</span>\n<span class="a-size-base">1,234 ratings</span>\n<br>\n4.0 out of 5 stars'),
+    ('Best Sellers Rank', '<span><span>#1,234 in Electronics (<a href="#">See Top 100 in Electronics</a>)</span>\n<br>\n<span>#56 in <a href="#">Smartphones</a></span></span>'),
+    ('Date First Available', '1 April 2022'), ('Manufacturer', 'HMD Global'), ('Country of Origin', 'India'), ('Packer', 'HMD Global, Noida'), ('Item part number', 'C01 Plus')]
+
+## Function to render spec rows as a tech-spec table, or as the detail bullets some product pages have instead
+def spec_block(rows, layout='table'):
+    if layout == 'bullets':
+        bullets = "".join(f'<li><span class="a-list-item">\n<span class="a-text-bold">{key}\n\u200f\n:\n\u200e\n</span>\n<span>{value}</span>\n</span></li>\n' for key, value in rows)
+        return f'<div id="detailBullets_feature_div">\n<ul class="a-unordered-list a-nostyle a-vertical a-spacing-none detail-bullet-list">\n{bullets}</ul></div>'
+    specs = "".join(f'<tr><th class="a-color-secondary a-size-base prodDetSectionEntry"> {key} </th><td class="a-size-base prodDetAttrValue"> \u200e{value} </td></tr>\n' for key, value in rows)
+    return f'<table id="productDetails_techSpec_section_1" class="a-keyvalue prodDetTable">\n{specs}</table>'
+
+## Function to build an Amazon-like product page, 'filler' unrelated blocks make it as heavy as a real page
+## 'layout' is 'table' or 'bullets' for the specs, 'details' the rows of the details table
+def product_page(filler=3000, seed=0, layout='table', details=PRODUCT_DETAILS):
+    rng = random.Random(seed)
+    noise = "".join(f'<div class="a-section s-widget-{i}"><a href="/dp/B0{i:08d}"><span class="a-size-base">{" ".join(rng.choice(WORDS) for _ in range(12))}</span></a><i class="a-icon a-icon-star-small"><span class="a-icon-alt">{rng.randint(1, 5)}.0 out of 5 stars</span></i></div>' for i in range(filler))
+    scripts = "".join(f'<script type="text/javascript">P.when("A").execute(function(A){{ var data{i} = {{"asin":"B0{i:08d}","price":{rng.randint(100, 9999)}}}; }});</script>' for i in range(filler // 10))
+    features = "".join(f'<li><span class="a-list-item"> {" ".join(rng.choice(WORDS) for _ in range(15))} | {rng.choice(WORDS)} </span></li>\n' for _ in range(7))
+    details = "".join(f'<tr><th class="a-color-secondary a-size-base prodDetSectionEntry"> {key} </th><td class="a-size-base"> {value} </td></tr>\n' for key, value in details)
+    return f'''<html><head><title>Amazon.in</title>{scripts}</head><body>
+<div id="nav-main">{re.sub(r'<i class.*?</i>', '', noise[:len(noise)//2])}</div>
+<div id="centerCol">
+<span id="productTitle" class="a-size-large product-title-word-break">        Nokia C01 Plus 4G (Blue, 2GB RAM, 16GB Storage) with Selfie Flash       </span>
+<div id="averageCustomerReviews"><span id="acrPopover" class="reviewCountTextLinkedHistogram"><i class="a-icon a-icon-star a-star-4"><span class="a-icon-alt">4.0 out of 5 stars</span></i></span></div>
+<div id="corePriceDisplay_desktop_feature_div"><span class="a-price priceToPay"><span class="a-offscreen">₹5,999.00</span></span><span class="a-price a-text-price" data-a-strike="true"><span class="a-offscreen">₹7,999.00</span></span></div>
+<span id="priceblock_ourprice" class="a-size-medium a-color-price">₹5,999.00</span>
+<div id="feature-bullets" class="a-section a-spacing-medium a-spacing-top-small">
+<ul class="a-unordered-list a-vertical a-spacing-mini">
+<li><span class="a-list-item">Make sure this fits by entering your model number.</span></li>
+{features}</ul></div>
+</div>
+<div id="imgTagWrapperId"><img id="landingImage" data-a-dynamic-image='{{"https://m.media-amazon.com/images/I/61.jpg":[679,679],"https://m.media-amazon.com/images/I/41.jpg":[300,300]}}' src="https://m.media-amazon.com/images/I/41.jpg"></div>
+<table id="histogramTable" class="a-normal a-align-center a-spacing-base">
+<tr><td>5 star</td><td>50%</td></tr>\n<tr><td>4 star</td><td>19%</td></tr>\n<tr><td>3 star</td><td>10%</td></tr>\n<tr><td>2 star</td><td>10%</td></tr>\n<tr><td>1 star</td><td>11%</td></tr>
+</table>
+{spec_block(PRODUCT_SPECS, layout)}
+<div id="productDetails_db_sections" class="a-section">
+<h3 class="product-facts-title">Additional Information</h3>
+<table id="productDetails_detailBullets_sections1" class="a-keyvalue prodDetTable">
+{details}</table></div>
+<div id="rhf">{noise[len(noise)//2:]}</div>
+</body></html>'''
+
+## Function to load saved product pages named product-<name>.html from 'directory'
+def load_product_pages(directory):
+    pages = {}
+    for name in sorted(os.listdir(directory)):
+        if re.fullmatch(r'product-.+\.html', name):
+            with open(os.path.join(directory, name), encoding='utf-8') as handle:
+                pages[name] = handle.read()
+    return pages
+
+## Function to load saved review pages named reviews-<pageNo>.html from 'directory'
+def load_review_pages(directory):
+    pages = {}
+    for name in os.listdir(directory):
+        pageNo = re.fullmatch(r'reviews-(\d+)\.html', name)
+        if pageNo is not None:
+            with open(os.path.join(directory, name), encoding='utf-8') as handle:
+                pages[int(pageNo.group(1))] = handle.read()
+    return [pages[pageNo] for pageNo in sorted(pages)]
+
+## Local HTTP server : /product-reviews/...?pageNumber=N serves review page N (or an empty page), anything else the product page
+class StubServer:
+    def __init__(self, reviewPages, productPage='', latency=0.0):
+        emptyPage = review_page([])
+        requestLog = self.requests = []
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                requestLog.append(self.path)
+                time.sleep(latency)
+                url = urlsplit(self.path)
+                if url.path.startswith('/product-reviews/'):
+                    pageNo = int(parse_qs(url.query).get('pageNumber', ['1'])[0])
+                    body = reviewPages[pageNo-1] if pageNo <= len(reviewPages) else emptyPage
+                else:
+                    body = productPage
+                body = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+## (context, question, answer) triples about the fixture product, for answer accuracy benchmarks
+QA_TRIPLES = [
+    ("Product has 3000 mAh battery with up to 10 hours of talk time.", "what is the battery capacity", "3000 mAh"),
+    ("Product has 3000 mAh battery with up to 10 hours of talk time.", "how long is the talk time", "up to 10 hours"),
+    ("Product has 5.45 inch HD+ screen with a 18:9 aspect ratio.", "what is the screen size", "5.45 inch"),
+    ("Product has Unisoc octa-core processor, 2GB RAM and 16GB storage.", "which processor does it have", "Unisoc octa-core processor"),
+    ("Product has Unisoc octa-core processor, 2GB RAM and 16GB storage.", "how much storage does it have", "16GB"),
+    ("Brand is Nokia. Model Name is C01 Plus. Item Weight is 150 g. Colour is Blue.", "what is the weight", "150 g"),
+    ("Brand is Nokia. Model Name is C01 Plus. Item Weight is 150 g. Colour is Blue.", "what is the colour", "Blue"),
+    ("Brand is Nokia. Model Name is C01 Plus. Item Weight is 150 g. Colour is Blue.", "which brand makes it", "Nokia"),
+    ("Charging is 5W standard charging over a micro USB port. Fast charging is not supported.", "which port does it use for charging", "micro USB"),
+    ("Manufacturer is HMD Global. Country of Origin is India. Date First Available is 1 April 2022.", "where is it made", "India"),
+    ("Manufacturer is HMD Global. Country of Origin is India. Date First Available is 1 April 2022.", "who is the manufacturer", "HMD Global"),
+    ("Good phone for the price, the sound quality is loud and clear but the camera is average in low light.", "how is the camera", "average in low light"),
+]
+
+## Function to build a small randomly initialized DistilBERT QnA model and a tokenizer whose vocabulary covers 'texts',
+## so model benchmarks run offline without the pretrained weights
+def tiny_qna_model(directory, texts, dim=256, layers=4, seed=0):
+    import torch
+    from transformers import DistilBertConfig, DistilBertForQuestionAnswering, DistilBertTokenizerFast
+    words = sorted(set(re.findall(r'\w+|[^\w\s]', ' '.join(texts).lower())))
+    vocabPath = os.path.join(directory, 'vocab.txt')
+    with open(vocabPath, 'w', encoding='utf-8') as handle:
+        handle.write('\n'.join(['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]'] + words))
+    torch.manual_seed(seed)
+    config = DistilBertConfig(vocab_size=len(words)+5, dim=dim, hidden_dim=4*dim, n_layers=layers, n_heads=max(1, dim//64), max_position_embeddings=512)
+    return DistilBertForQuestionAnswering(config).eval(), DistilBertTokenizerFast(vocab_file=vocabPath)
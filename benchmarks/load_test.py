@@ -0,0 +1,78 @@
+## Load test : concurrent clients asking questions to a running service.py, reports p50/p99 latency and questions/sec
+## RUN : python service.py & python benchmarks/load_test.py [--url PRODUCT_URL] [--clients 16] [--requests 400] [--cached]
+import json
+import time
+import asyncio
+import argparse
+
+QUESTIONS = [
+    "what is the battery life",
+    "is it waterproof",
+    "what is the weight",
+    "which processor does it have",
+    "how much storage does it have",
+    "what is the screen size",
+    "does it support fast charging",
+    "what is the colour",
+]
+CONTEXTS = [
+    "Product has 3000 mAh battery with up to 10 hours of talk time. Product has 5.45 inch HD+ screen. Product has Unisoc octa-core processor, 2GB RAM and 16GB storage. ",
+    "Brand is Nokia. Model Name is C01 Plus. Item Weight is 150 g. Colour is Blue. Water Resistance Level is Not Water Resistant. Charging is 5W standard charging. ",
+]
+
+## One keep-alive connection per client, every client asks 'count' questions back to back
+async def client(host, port, body, count, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    for i in range(count):
+        payload = json.dumps(body(i)).encode('utf-8')
+        start = time.perf_counter()
+        writer.write(f'POST /answer HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n'.encode('latin-1') + payload)
+        await writer.drain()
+        status = (await reader.readline()).split()[1]
+        length = 0
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if line == '':
+                break
+            if line.lower().startswith('content-length:'):
+                length = int(line.split(':')[1])
+        response = await reader.readexactly(length)
+        if status != b'200':
+            raise RuntimeError(response.decode('utf-8'))
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values)-1, int(round(q / 100 * (len(values)-1))))]
+
+async def main(args):
+    if args.url:
+        body = lambda i : {'url' : args.url, 'question' : QUESTIONS[i % len(QUESTIONS)], 'cache' : args.cached}
+    else:
+        body = lambda i : {'contexts' : CONTEXTS, 'productID' : 'load-test', 'question' : QUESTIONS[i % len(QUESTIONS)], 'cache' : args.cached}
+
+    ## One warm-up question so model loading and scraping are not measured
+    await client(args.host, args.port, body, 1, [])
+
+    latencies = []
+    perClient = max(1, args.requests // args.clients)
+    start = time.perf_counter()
+    await asyncio.gather(*[client(args.host, args.port, lambda i, offset=c : body(i + offset), perClient, latencies) for c in range(args.clients)])
+    elapsed = time.perf_counter() - start
+
+    print(f'clients       : {args.clients}')
+    print(f'questions     : {len(latencies)}')
+    print(f'p50 latency   : {percentile(latencies, 50)*1000:.1f} ms')
+    print(f'p99 latency   : {percentile(latencies, 99)*1000:.1f} ms')
+    print(f'throughput    : {len(latencies)/elapsed:.1f} questions/sec')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--url', help='product link to ask about, fixed contexts are used otherwise')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--cached', action='store_true', help='let repeated questions hit the answer cache instead of the model')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,128 @@
+## Importing required Libraries
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from urllib.parse import urlsplit
+import pyarrow as pa
+
+from scraper import scrape_data, scrape_reviews, ReviewStore
+
+## Cache settings, overridable through the environment
+CACHE_PATH = os.environ.get('ESELLER_CACHE_PATH', '.eseller_cache.sqlite')
+CACHE_TTL = float(os.environ.get('ESELLER_CACHE_TTL', 6 * 3600))
+CACHE_STALE_TTL = float(os.environ.get('ESELLER_CACHE_STALE_TTL', 24 * 3600))
+CACHE_MAX_BYTES = int(os.environ.get('ESELLER_CACHE_MAX_BYTES', 256 * 2**20))
+
+## Function to get the ASIN of an Amazon product link, or the link itself when it has none
+def get_product_id(productURL):
+    productID = re.search(r'/(?:dp|gp/product|product-reviews)/([A-Z0-9]{10})', productURL)
+    if productID is None:
+        return productURL
+    return productID.group(1)
+
+## Function to get the canonical product and review links, dropping the ref= / spLa= tracking parts
+def normalize_url(productURL):
+    productID = get_product_id(productURL)
+    if productID == productURL:
+        return productURL, productURL, productURL+'&reviewerType=all_reviews'
+    url = urlsplit(productURL)
+    origin = f'{url.scheme or "https"}://{url.netloc}'
+    return productID, f'{origin}/dp/{productID}', f'{origin}/product-reviews/{productID}/?reviewerType=all_reviews'
+
+## SQLite store of scraped payloads with a TTL, stale-while-revalidate refresh and eviction by total size
+class ProductCache:
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL, staleTTL=CACHE_STALE_TTL, maxBytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.staleTTL = staleTTL
+        self.maxBytes = maxBytes
+        self.refreshing = set()
+        self.lock = threading.Lock()
+        with self.connect() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, payload BLOB, fetched REAL, accessed REAL, size INTEGER)')
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute('PRAGMA journal_mode=WAL')
+        return connection
+
+    def read(self, key):
+        with self.connect() as connection:
+            row = connection.execute('SELECT payload, fetched FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                connection.execute('UPDATE entries SET accessed = ? WHERE key = ?', (time.time(), key))
+        return row
+
+    def write(self, key, payload):
+        now = time.time()
+        with self.connect() as connection:
+            connection.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)', (key, payload, now, now, len(payload)))
+            ## Evict the least recently used entries until the store fits in maxBytes
+            total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            for oldKey, size in connection.execute('SELECT key, size FROM entries WHERE key != ? ORDER BY accessed', (key,)).fetchall():
+                if total <= self.maxBytes:
+                    break
+                connection.execute('DELETE FROM entries WHERE key = ?', (oldKey,))
+                total -= size
+
+    def refresh(self, key, fetch, keep=None):
+        try:
+            payload = fetch()
+            if keep is None or keep(payload):
+                self.write(key, payload)
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+    ## Function to get the payload of 'key', calling 'fetch' only when it is missing or past its stale TTL
+    ## Payloads 'keep' rejects (a blocked or captcha page) are returned but not stored, so the next call fetches again
+    def get(self, key, fetch, keep=None):
+        row = self.read(key)
+        if row is not None:
+            payload, fetched = row
+            age = time.time() - fetched
+            if age < self.ttl:
+                return payload
+            if age < self.ttl + self.staleTTL:
+                ## Serve the stale copy and refresh it in the background, once per key
+                with self.lock:
+                    if key not in self.refreshing:
+                        self.refreshing.add(key)
+                        threading.Thread(target=self.refresh, args=(key, fetch, keep), daemon=True).start()
+                return payload
+        payload = fetch()
+        if keep is None or keep(payload):
+            self.write(key, payload)
+        return payload
+
+    def clear(self):
+        with self.connect() as connection:
+            connection.execute('DELETE FROM entries')
+
+productCache = ProductCache()
+
+## Function to get the scraped product data of 'productURL' through the cache
+def get_product(productURL):
+    productID, productPageURL, reviewsURL = normalize_url(productURL)
+    fetch = lambda : json.dumps(scrape_data(productPageURL)).encode('utf-8')
+    ## A page without a product title is a blocked or captcha page, not a product
+    keep = lambda payload : len(json.loads(payload)['product_data']['productNames']) > 0
+    return json.loads(productCache.get('product:'+productID, fetch, keep))
+
+## Function to get the scraped reviews of 'productURL' through the cache, stored as an Arrow IPC stream
+def get_reviews(productURL):
+    productID, productPageURL, reviewsURL = normalize_url(productURL)
+
+    def fetch():
+        table = scrape_reviews(reviewsURL).table
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    ## A crawl blocked at the first page has no reviews, it is retried rather than kept for the whole TTL
+    keep = lambda payload : pa.ipc.open_stream(payload).read_all().num_rows > 0
+    return ReviewStore(pa.ipc.open_stream(productCache.get('reviews:'+productID, fetch, keep)).read_all().to_batches())
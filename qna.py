@@ -0,0 +1,205 @@
+## Importing required Libraries
+import re
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+import torch
+
+from spelling import get_corrector
+from registry import registry
+from answer_cache import answerCache
+from timing import stage
+
+## Limits used to split long contexts into windows DistilBERT can read (max 512 tokens)
+MAX_LENGTH = 384
+MAX_QUESTION_LENGTH = 64
+STRIDE = 128
+MAX_ANSWER_LENGTH = 30
+CONTEXT_WINDOW = MAX_LENGTH - MAX_QUESTION_LENGTH - 3
+MAX_CACHED_CONTEXTS = 256
+
+## Tokenized context : token ids, character offsets of every token and (start, end) token windows
+EncodedContext = namedtuple('EncodedContext', ['text', 'ids', 'offsets', 'windows'])
+
+## Function to correct the spelling of every word in the 'question', keeping the terms of the product 'contexts'
+def check_spelling(question, contexts=(), productID=None):
+    question = re.sub(r'[^\w\s]', '', question)
+    question = question.lower()
+
+    question = get_corrector(productID, contexts).correct(question)
+    return (question + " ?")
+
+## Function to split 'length' context tokens into windows of 'windowSize' tokens overlapping by 'stride' tokens
+def context_windows(length, windowSize, stride=STRIDE):
+    windows = []
+    step = max(windowSize - stride, 1)
+    start = 0
+    while start < length:
+        end = min(start + windowSize, length)
+        windows.append((start, end))
+        if end == length:
+            break
+        start += step
+    return windows
+
+## Function to tokenize a 'context' once with a fast tokenizer, windows do not depend on the question
+def encode_context(tokenizer, context):
+    encoding = tokenizer(context, add_special_tokens=False, return_offsets_mapping=True)
+    ids = encoding['input_ids']
+    return EncodedContext(context, ids, encoding['offset_mapping'], context_windows(len(ids), CONTEXT_WINDOW))
+
+## LRU cache of encoded contexts keyed by product ID and context hash
+class ContextCache:
+    def __init__(self, maxSize=MAX_CACHED_CONTEXTS):
+        self.maxSize = maxSize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, tokenizer, context, productID=None):
+        key = (productID, hashlib.sha1(context.encode('utf-8')).hexdigest())
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        encoded = encode_context(tokenizer, context)
+        with self.lock:
+            self.entries[key] = encoded
+            if len(self.entries) > self.maxSize:
+                self.entries.popitem(last=False)
+        return encoded
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+contextCache = ContextCache()
+
+## Function to encode the non-empty 'contexts' of a product through the shared cache
+def encode_contexts(tokenizer, contexts, productID=None):
+    return [contextCache.get(tokenizer, context, productID) for context in contexts if context.strip() != '']
+
+## Function to answer every ('question', encoded contexts) pair in 'items' with one padded forward pass
+def answer_questions(model, tokenizer, items):
+    ## Build one input per (question, context window), only the question is tokenized here
+    features = []
+    with stage('qna.tokenize', questions=len(items)):
+        for itemNo, (question, contexts) in enumerate(items):
+            questionIds = tokenizer.encode(question, add_special_tokens=False)[:MAX_QUESTION_LENGTH]
+            for context in contexts:
+                for start, end in context.windows:
+                    inputIds = [tokenizer.cls_token_id] + questionIds + [tokenizer.sep_token_id] + context.ids[start:end] + [tokenizer.sep_token_id]
+                    features.append({
+                        'item' : itemNo,
+                        'context' : context,
+                        'inputIds' : inputIds,
+                        'start' : start,
+                        'length' : end - start,
+                        'offset' : len(questionIds) + 2,
+                    })
+
+    ## Questions with nothing to read keep an empty answer and a None score (JSON null, not -Infinity)
+    answers = [{'context': '', 'question': question, 'answer': '', 'score': None} for question, contexts in items]
+    if len(features) == 0:
+        return answers
+
+    ## Pad all windows into a single batch
+    seqLength = max(len(feature['inputIds']) for feature in features)
+    inputIds = torch.full((len(features), seqLength), tokenizer.pad_token_id, dtype=torch.long)
+    attentionMask = torch.zeros((len(features), seqLength), dtype=torch.long)
+    contextMask = torch.zeros((len(features), seqLength), dtype=torch.bool)
+    for i, feature in enumerate(features):
+        inputIds[i, :len(feature['inputIds'])] = torch.tensor(feature['inputIds'])
+        attentionMask[i, :len(feature['inputIds'])] = 1
+        contextMask[i, feature['offset'] : feature['offset'] + feature['length']] = True
+
+    with torch.inference_mode():
+        with stage('qna.forward', questions=len(items), windows=len(features), seqLength=seqLength):
+            outputs = model(input_ids=inputIds, attention_mask=attentionMask)
+        startScores = outputs.start_logits.masked_fill(~contextMask, -1e4)
+        endScores = outputs.end_logits.masked_fill(~contextMask, -1e4)
+
+        ## Score every (start, end) span, keeping only spans with start <= end < start + MAX_ANSWER_LENGTH
+        spanScores = startScores[:, :, None] + endScores[:, None, :]
+        band = torch.ones((seqLength, seqLength), dtype=torch.bool)
+        band = torch.triu(band) & ~torch.triu(band, diagonal=MAX_ANSWER_LENGTH)
+        spanScores = spanScores.masked_fill(~band, float('-inf'))
+        bestScores, bestSpans = spanScores.view(len(features), -1).max(dim=1)
+
+    ## Keep the best span of every question across all of its windows
+    for i, feature in enumerate(features):
+        score = bestScores[i].item()
+        answer = answers[feature['item']]
+        if answer['score'] is not None and score <= answer['score']:
+            continue
+        ## Map the span back to the original context text through the token offsets
+        context = feature['context']
+        start = feature['start'] + bestSpans[i].item() // seqLength - feature['offset']
+        end = feature['start'] + bestSpans[i].item() % seqLength - feature['offset']
+        answer['context'] = context.text
+        answer['answer'] = context.text[context.offsets[start][0] : context.offsets[end][1]]
+        answer['score'] = score
+
+    return answers
+
+## Function to get the contexts a question about the product is answered from
+def product_contexts(product_data):
+    return [product_data['context1'], product_data['context2'], '. '.join(product_data['productDetails'])]
+
+## Function to get the contexts to read : the top passages of 'passageIndex' for the question, or all 'contexts' when none match
+def select_contexts(contexts, question, passageIndex=None):
+    if passageIndex is not None:
+        context = passageIndex.get_context(question)
+        if context is not None:
+            return [context]
+    return contexts
+
+## Prepare step, part 1 : the answer of a question that needs no model, None otherwise
+## Questions naming a spec key of 'attributeIndex' are answered from the spec value, without spell correction or the model
+## Other answers are cached per product, so repeated and paraphrased questions skip the model too
+def lookup_answer(question, productID=None, attributeIndex=None, useCache=True):
+    if attributeIndex is not None:
+        with stage('qna.attributes', productID=productID):
+            attribute = attributeIndex.lookup(question)
+        if attribute is not None:
+            return {'context': attribute['key'] + ' is ' + attribute['answer'], 'question' : question, 'answer' : attribute['answer'], 'score' : attribute['score']}
+
+    if productID is not None and useCache:
+        with stage('qna.answer_cache', productID=productID):
+            return answerCache.get(productID, question)
+    return None
+
+## Prepare step, part 2 : the (corrected question, encoded contexts) input of answer_questions for a question the model reads
+def prepare_inputs(contexts, question, productID=None, passageIndex=None):
+    tokenizer = registry.get('qna_tokenizer')
+    with stage('qna.spelling', productID=productID):
+        correctedQuestion = check_spelling(question, contexts, productID)
+    with stage('qna.retrieval', productID=productID):
+        contexts = select_contexts(contexts, correctedQuestion, passageIndex)
+    with stage('qna.encode_contexts', productID=productID):
+        return correctedQuestion, encode_contexts(tokenizer, contexts, productID)
+
+## Answer step : the answer dict of a model 'result' for the asked 'question', stored in the answer cache
+def finish_answer(result, question, productID=None, useCache=True):
+    answer = {'context': result['context'], 'question' : result['question'], 'answer' : result['answer'], 'score' : result['score']}
+    if productID is not None and useCache:
+        answerCache.put(productID, question, answer)
+    return answer
+
+## Function to answer every (contexts, question, productID, passageIndex, attributeIndex) tuple of 'items'
+## with the process-wide models, the questions the model has to read go through one padded forward pass
+def qna_bert_batch(items):
+    answers = [lookup_answer(question, productID, attributeIndex) for contexts, question, productID, passageIndex, attributeIndex in items]
+    pending = [itemNo for itemNo, answer in enumerate(answers) if answer is None]
+    if len(pending) == 0:
+        return answers
+
+    model = registry.get('qna_model')
+    tokenizer = registry.get('qna_tokenizer')
+    inputs = [prepare_inputs(items[itemNo][0], items[itemNo][1], items[itemNo][2], items[itemNo][3]) for itemNo in pending]
+    for itemNo, result in zip(pending, answer_questions(model, tokenizer, inputs)):
+        answers[itemNo] = finish_answer(result, items[itemNo][1], items[itemNo][2])
+    return answers
+
+## Function to answer the 'question' based on the given 'contexts', with the process-wide models
+def qna_bert(contexts, question, productID=None, passageIndex=None, attributeIndex=None):
+    return qna_bert_batch([(contexts, question, productID, passageIndex, attributeIndex)])[0]
@@ -0,0 +1,195 @@
+## Importing required Libraries
+import os
+import time
+import pickle
+import threading
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+QNA_MODEL = 'distilbert-base-uncased-distilled-squad'
+QNA_TOKENIZER = 'distilbert-base-uncased'
+SENTIMENT_MODEL = os.path.join(MODEL_DIR, 'sentimentAnalysisModel')
+SENTIMENT_TOKENIZER = os.path.join(MODEL_DIR, 'tokenizer.pickle')
+## CPU inference settings of the QnA model : 'fp32', or 'int8' for dynamically quantized linear layers,
+## and the torch intra-op / inter-op thread counts (0 keeps the torch default)
+QNA_BACKEND = os.environ.get('ESELLER_QNA_BACKEND', 'fp32')
+TORCH_THREADS = int(os.environ.get('ESELLER_TORCH_THREADS', 0))
+TORCH_INTEROP_THREADS = int(os.environ.get('ESELLER_TORCH_INTEROP_THREADS', 0))
+## Seconds before a failed model is loaded again, doubled after every further failure up to MAX_RETRY_BACKOFF
+RETRY_BACKOFF = 30
+MAX_RETRY_BACKOFF = 600
+
+## Function to estimate the memory held by the weights of a torch or keras model
+def model_bytes(model):
+    if hasattr(model, 'state_dict') and hasattr(model, 'parameters'):
+        ## The state dict also holds the packed weights of quantized layers, which parameters() skips
+        total = 0
+        for value in model.state_dict().values():
+            for tensor in (value if isinstance(value, tuple) else (value,)):
+                if hasattr(tensor, 'element_size'):
+                    total += tensor.numel() * tensor.element_size()
+        return total
+    if hasattr(model, 'weights'):
+        return sum(weight.numpy().nbytes for weight in model.weights)
+    return None
+
+## Function to get the resident memory of this process
+def process_bytes():
+    try:
+        with open('/proc/self/statm') as handle:
+            return int(handle.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+## Process-wide registry : every model is loaded once, by the first caller, and shared by all sessions
+class ModelRegistry:
+    def __init__(self):
+        self.loaders = {}
+        self.models = {}
+        self.states = {}
+        self.errors = {}
+        self.loadTimes = {}
+        self.failures = {}
+        self.failedAt = {}
+        self.events = {}
+        self.warmThread = None
+        self.lock = threading.Lock()
+
+    def register(self, name, load, warmUp=None):
+        with self.lock:
+            self.loaders[name] = (load, warmUp)
+            self.states[name] = 'pending'
+            self.failures[name] = 0
+            self.events[name] = threading.Event()
+
+    ## Function to get the seconds to wait after the last failure of 'name' before loading it again
+    def retry_delay(self, name):
+        return min(RETRY_BACKOFF * 2 ** (self.failures[name] - 1), MAX_RETRY_BACKOFF)
+
+    ## Function to get the model 'name', loading it in this thread or waiting for the thread already loading it
+    ## A failed model is loaded again by the first caller after its retry delay, the callers before that get the error
+    def get(self, name):
+        with self.lock:
+            state = self.states[name]
+            if state == 'failed' and time.time() - self.failedAt[name] >= self.retry_delay(name):
+                state = 'pending'
+                self.events[name].clear()
+            if state == 'pending':
+                self.states[name] = 'loading'
+        if state == 'pending':
+            self.load(name)
+        self.events[name].wait()
+        ## Not ready here also covers a retry started by another caller after this one was woken by a failure
+        if self.states[name] != 'ready':
+            raise RuntimeError(f'{name} failed to load : {self.errors.get(name)}')
+        return self.models[name]
+
+    def load(self, name):
+        load, warmUp = self.loaders[name]
+        start = time.perf_counter()
+        try:
+            model = load()
+            if warmUp is not None:
+                warmUp(model)
+            self.models[name] = model
+            self.failures[name] = 0
+            self.errors.pop(name, None)
+            self.states[name] = 'ready'
+        except Exception as error:
+            self.errors[name] = repr(error)
+            self.failures[name] += 1
+            self.failedAt[name] = time.time()
+            self.states[name] = 'failed'
+        self.loadTimes[name] = time.perf_counter() - start
+        self.events[name].set()
+
+    ## Function to load and warm every registered model in a background thread, once per process
+    def warm_up(self):
+        with self.lock:
+            if self.warmThread is not None:
+                return self.warmThread
+            self.warmThread = threading.Thread(target=self.load_all, name='model-warm-up', daemon=True)
+        self.warmThread.start()
+        return self.warmThread
+
+    def load_all(self):
+        for name in list(self.loaders):
+            try:
+                self.get(name)
+            except RuntimeError:
+                pass
+
+    def is_ready(self, name):
+        return self.states.get(name) == 'ready'
+
+    ## Function to get the load state, load time and weight memory of every model, plus the process memory
+    def status(self):
+        models = {}
+        for name, state in self.states.items():
+            models[name] = {
+                'state' : state,
+                'loadSeconds' : self.loadTimes.get(name),
+                'bytes' : model_bytes(self.models[name]) if state == 'ready' else None,
+                'error' : self.errors.get(name),
+                'failures' : self.failures.get(name, 0),
+            }
+        return {'models' : models, 'processBytes' : process_bytes()}
+
+## Function to set the torch thread pools, the inter-op pool can only be sized before its first use
+def set_torch_threads(threads=TORCH_THREADS, interopThreads=TORCH_INTEROP_THREADS):
+    import torch
+    if threads > 0:
+        torch.set_num_threads(threads)
+    if interopThreads > 0 and torch.get_num_interop_threads() != interopThreads:
+        try:
+            torch.set_num_interop_threads(interopThreads)
+        except RuntimeError:
+            pass
+
+## Function to get the QnA model prepared for the inference 'backend'
+def prepare_qna_model(model, backend=QNA_BACKEND):
+    import torch
+    model = model.eval()
+    if backend == 'int8':
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if backend != 'fp32':
+        raise ValueError(f'unknown QnA backend {backend!r}, expected fp32 or int8')
+    return model
+
+## Loaders and warm-up inferences of the app models
+def load_qna_model():
+    from transformers import DistilBertForQuestionAnswering
+    set_torch_threads()
+    return prepare_qna_model(DistilBertForQuestionAnswering.from_pretrained(QNA_MODEL))
+
+def load_qna_tokenizer():
+    from transformers import DistilBertTokenizerFast
+    return DistilBertTokenizerFast.from_pretrained(QNA_TOKENIZER)
+
+def warm_qna_model(model):
+    from qna import encode_context, answer_questions
+    tokenizer = registry.get('qna_tokenizer')
+    answer_questions(model, tokenizer, [('what is the battery life ?', [encode_context(tokenizer, 'Product has 10 hours of battery life.')])])
+
+def load_sentiment_model():
+    import tensorflow
+    return tensorflow.keras.models.load_model(SENTIMENT_MODEL)
+
+def warm_sentiment_model(model):
+    import numpy as np
+    model.predict(np.zeros((1, model.input_shape[1]), dtype='int32'))
+
+def load_sentiment_tokenizer():
+    with open(SENTIMENT_TOKENIZER, 'rb') as handle:
+        return pickle.load(handle)
+
+def load_spelling_index():
+    from spelling import get_base_index
+    return get_base_index()
+
+registry = ModelRegistry()
+registry.register('qna_tokenizer', load_qna_tokenizer)
+registry.register('qna_model', load_qna_model, warm_qna_model)
+registry.register('sentiment_tokenizer', load_sentiment_tokenizer)
+registry.register('sentiment_model', load_sentiment_model, warm_sentiment_model)
+registry.register('spelling_index', load_spelling_index)
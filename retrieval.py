@@ -0,0 +1,100 @@
+## Importing required Libraries
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+from scipy import sparse
+
+from text import STOP_WORDS
+
+## Passage and BM25 settings
+TOP_K = 5
+REVIEW_PASSAGE_WORDS = 64
+DETAIL_PASSAGE_ITEMS = 6
+K1 = 1.5
+B = 0.75
+MAX_CACHED_INDEXES = 64
+
+## Function to split a text into lowercase word tokens without stop words
+def tokenize(text):
+    return [word for word in re.findall(r'\w+', text.lower()) if word not in STOP_WORDS]
+
+## Function to chunk the product data and review texts into short passages
+def get_passages(product_data, reviews=()):
+    passages = []
+    features = product_data['productFeatures']
+    for i in range(1, len(features)-1):
+        passages.append('Product has ' + features[i].replace(' | ', ', ') + '.')
+    specs = product_data['productSpecs']
+    for i in range(0, len(specs)-1, 2):
+        passages.append(specs[i] + ' is ' + specs[i+1] + '.')
+    details = product_data['productDetails']
+    for i in range(0, len(details), DETAIL_PASSAGE_ITEMS):
+        passages.append(' '.join(details[i : i+DETAIL_PASSAGE_ITEMS]))
+    for review in reviews:
+        words = review.split()
+        for i in range(0, len(words), REVIEW_PASSAGE_WORDS):
+            passages.append(' '.join(words[i : i+REVIEW_PASSAGE_WORDS]))
+    return passages
+
+## Sparse BM25 index over the passages of one product : a (passages x terms) matrix of precomputed BM25 weights
+class PassageIndex:
+    def __init__(self, passages):
+        self.passages = passages
+        self.vocabulary = {}
+        rows, columns = [], []
+        for row, passage in enumerate(passages):
+            for word in tokenize(passage):
+                rows.append(row)
+                columns.append(self.vocabulary.setdefault(word, len(self.vocabulary)))
+
+        ## Duplicate (row, column) entries are summed into term frequencies
+        termFrequency = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, columns)), shape=(len(passages), len(self.vocabulary)))
+        termFrequency.sum_duplicates()
+        lengths = np.asarray(termFrequency.sum(axis=1)).reshape(-1)
+        documentFrequency = np.bincount(termFrequency.indices, minlength=len(self.vocabulary))
+        idf = np.log(1 + (len(passages) - documentFrequency + 0.5) / (documentFrequency + 0.5)).astype(np.float32)
+
+        norm = K1 * (1 - B + B * lengths / max(lengths.mean(), 1.0)) if len(passages) else lengths
+        weights = termFrequency.copy()
+        tf = weights.data
+        weights.data = idf[weights.indices] * tf * (K1 + 1) / (tf + np.repeat(norm, np.diff(weights.indptr)))
+        self.weights = weights.tocsc()
+
+    ## Function to get the top 'k' (score, passage) pairs for the 'question', best first
+    def search(self, question, k=TOP_K):
+        terms = [self.vocabulary[word] for word in set(tokenize(question)) if word in self.vocabulary]
+        if len(terms) == 0:
+            return []
+        scores = np.asarray(self.weights[:, terms].sum(axis=1)).reshape(-1)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k-1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.passages[i]) for i in top if scores[i] > 0]
+
+    ## Function to get the top passages joined into one reader context, None when nothing matches
+    def get_context(self, question, k=TOP_K):
+        passages = self.search(question, k)
+        if len(passages) == 0:
+            return None
+        return ' '.join(passage for score, passage in passages)
+
+## Function to build the passage index of a product
+def build_passage_index(product_data, reviews=()):
+    return PassageIndex(get_passages(product_data, reviews))
+
+## Process-wide LRU of passage indexes by product ID, 'build' is only called on a miss
+passageIndexes = OrderedDict()
+passageIndexesLock = threading.Lock()
+
+def get_passage_index(productID, build):
+    with passageIndexesLock:
+        if productID in passageIndexes:
+            passageIndexes.move_to_end(productID)
+            return passageIndexes[productID]
+    passageIndex = build()
+    with passageIndexesLock:
+        passageIndexes[productID] = passageIndex
+        if len(passageIndexes) > MAX_CACHED_INDEXES:
+            passageIndexes.popitem(last=False)
+    return passageIndex
@@ -0,0 +1,340 @@
+## Importing required Libraries
+import re
+import json
+import math
+import time
+import threading
+from urllib.parse import urlsplit
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import pyarrow as pa
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup as bs, SoupStrainer
+
+from timing import stage
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/78.0.3904.108 Safari/537.36", "Accept-Encoding":"gzip, deflate", "Accept":"text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8", "DNT":"1","Connection":"keep-alive", "Upgrade-Insecure-Requests":"1"}
+
+## Crawler settings
+MAX_CONCURRENCY = 4
+MIN_INTERVAL = 0.1
+MAX_RETRIES = 3
+BACKOFF = 0.5
+RETRY_STATUS = (429, 500, 502, 503, 504)
+TIMEOUT = 15
+REVIEWS_PER_PAGE = 10
+MAX_PAGES = 500
+
+## Politeness limiter : at most one request per 'minInterval' seconds to every host
+## 'nextSlot' and 'lock' can be multiprocessing.Manager proxies, so that worker processes share one limit
+class HostLimiter:
+    def __init__(self, minInterval=MIN_INTERVAL, nextSlot=None, lock=None):
+        self.minInterval = minInterval
+        self.nextSlot = {} if nextSlot is None else nextSlot
+        self.lock = threading.Lock() if lock is None else lock
+
+    def wait(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.nextSlot.get(host, now))
+            self.nextSlot[host] = slot + self.minInterval
+        if slot > now:
+            time.sleep(slot - now)
+
+## Review crawler over a pooled keep-alive session, fetching pages on a bounded thread pool
+class ReviewCrawler:
+    def __init__(self, concurrency=MAX_CONCURRENCY, minInterval=MIN_INTERVAL, retries=MAX_RETRIES, backoff=BACKOFF, timeout=TIMEOUT, limiter=None):
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = HostLimiter(minInterval) if limiter is None else limiter
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    ## Function to fetch the 'url', retrying with exponential backoff on connection errors and RETRY_STATUS
+    def fetch(self, url):
+        for attempt in range(self.retries + 1):
+            self.limiter.wait(url)
+            try:
+                page = self.session.get(url, timeout=self.timeout)
+                if page.status_code not in RETRY_STATUS:
+                    return page.content
+                if attempt == self.retries:
+                    page.raise_for_status()
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+            time.sleep(self.backoff * (2 ** attempt))
+
+    def fetch_page(self, url):
+        with stage('scrape_reviews.fetch', url=url):
+            content = self.fetch(url)
+        with stage('scrape_reviews.parse', bytes=len(content)):
+            return parse_review_page(content)
+
+    ## Generator over the parsed review pages of 'reviewsURL' in page order, each page is parsed as soon as it is fetched
+    def crawl(self, reviewsURL):
+        pageURL = lambda pageNo : reviewsURL+'&pageNumber='+str(pageNo)
+        firstPage = self.fetch_page(pageURL(1))
+        yield firstPage
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            ## The review count on the first page tells how many pages there are
+            if firstPage.pageCount is not None:
+                for reviewsPage in pool.map(self.fetch_page, [pageURL(pageNo) for pageNo in range(2, min(firstPage.pageCount, MAX_PAGES)+1)]):
+                    if reviewsPage.isLast:
+                        return
+                    yield reviewsPage
+                return
+
+            ## Otherwise fetch 'concurrency' pages at a time until an empty page shows up
+            pageNo = 2
+            while pageNo <= MAX_PAGES:
+                pageNos = range(pageNo, min(pageNo + self.concurrency, MAX_PAGES+1))
+                for reviewsPage in pool.map(self.fetch_page, [pageURL(no) for no in pageNos]):
+                    if reviewsPage.isLast:
+                        return
+                    yield reviewsPage
+                pageNo += self.concurrency
+
+## Parsed review page : (name, title, rating, review) records, whether it is past the last page and the page count if shown
+ReviewPage = namedtuple('ReviewPage', ['reviews', 'isLast', 'pageCount'])
+
+## Only the review blocks and the review count are built into the tree
+REVIEW_STRAINER = SoupStrainer(attrs={"data-hook": ['review', 'cr-filter-info-review-rating-count']})
+
+## Function to parse one review page into compact records, the tree is dropped on return
+def parse_review_page(content):
+    reviewsSoup = bs(content,'html.parser', parse_only=REVIEW_STRAINER)
+
+    reviews = []
+    reviewBlocks = reviewsSoup.find_all('div', {"data-hook":"review"})
+    for review in reviewBlocks:
+        name = review.find('span',class_='a-profile-name')
+        title = review.find('a',class_='review-title-content')
+        rating = review.find('i',class_='review-rating')
+        body = review.find("span",{"data-hook":"review-body"})
+        if rating is None or body is None:
+            continue
+        reviews.append((
+            '' if name is None else name.get_text(),
+            '' if title is None else title.get_text().strip('\n'),
+            int(rating.get_text()[0]),
+            body.get_text().strip('\n'),
+        ))
+
+    ## A review page past the last one has no review blocks
+    return ReviewPage(reviews, len(reviewBlocks) == 0, get_page_count(reviewsSoup))
+
+## Function to get the number of review pages from the review count of a review page, if present
+def get_page_count(reviewsSoup):
+    reviewCount = reviewsSoup.find('div', {"data-hook":"cr-filter-info-review-rating-count"})
+    if reviewCount is None:
+        return None
+    reviewCount = re.search(r'([\d,]+)\s+with review', reviewCount.get_text())
+    if reviewCount is None:
+        return None
+    return math.ceil(int(reviewCount.group(1).replace(',', '')) / REVIEWS_PER_PAGE)
+
+## Columnar review store : every page becomes an Arrow record batch as soon as it is parsed
+REVIEW_SCHEMA = pa.schema([
+    ('Customer Name', pa.string()),
+    ('Review title', pa.string()),
+    ('Ratings', pa.int8()),
+    ('Reviews', pa.string()),
+])
+
+class ReviewStore:
+    def __init__(self, batches=()):
+        self.batches = list(batches)
+
+    def append(self, reviews):
+        if len(reviews) > 0:
+            columns = [pa.array(column, type=field.type) for column, field in zip(zip(*reviews), REVIEW_SCHEMA)]
+            self.batches.append(pa.RecordBatch.from_arrays(columns, schema=REVIEW_SCHEMA))
+
+    def __len__(self):
+        return sum(batch.num_rows for batch in self.batches)
+
+    @property
+    def table(self):
+        return pa.Table.from_batches(self.batches, schema=REVIEW_SCHEMA)
+
+    @property
+    def ratings(self):
+        return self.table.column('Ratings').to_numpy()
+
+    @property
+    def reviews(self):
+        return self.table.column('Reviews').to_pylist()
+
+    def to_pandas(self):
+        return self.table.to_pandas()
+
+crawler = ReviewCrawler()
+
+## Product page elements read by scrape_data : id -> tag name and class -> tag name
+PRODUCT_IDS = {
+    'productTitle' : 'span',
+    'priceblock_dealprice' : 'span',
+    'priceblock_ourprice' : 'span',
+    'tp_price_block_total_price_ww' : 'span',
+    'landingImage' : 'img',
+    'histogramTable' : 'table',
+    'feature-bullets' : 'div',
+    'productDetails_techSpec_section_1' : 'table',
+    'detailBullets_feature_div' : 'div',
+    'productDetails_db_sections' : 'div',
+}
+PRODUCT_CLASSES = {
+    'priceBlockStrikePriceString' : 'span',
+    'a-text-price' : 'span',
+    'a-icon-alt' : 'span',
+}
+## Blocks holding the class-matched prices and rating
+PRODUCT_CONTAINERS = ['averageCustomerReviews', 'acrPopover', 'corePrice_desktop', 'corePriceDisplay_desktop_feature_div', 'apex_desktop', 'price']
+
+## Only the subtrees of these ids are built into the tree
+PRODUCT_STRAINER = SoupStrainer(id=list(PRODUCT_IDS) + PRODUCT_CONTAINERS)
+
+## Function to collect the first element of every PRODUCT_IDS / PRODUCT_CLASSES entry in one traversal
+def collect_product_tags(productSoup):
+    tags = {}
+    for tag in productSoup.find_all(True):
+        ID = tag.get('id')
+        if PRODUCT_IDS.get(ID) == tag.name and ID not in tags:
+            tags[ID] = tag
+        for CLASS in tag.get('class', ()):
+            if PRODUCT_CLASSES.get(CLASS) == tag.name and CLASS not in tags:
+                tags[CLASS] = tag
+    return tags
+
+## Function to split the text of an element into its non-empty, stripped lines
+def split_text(text, pattern):
+    return [item.strip() for item in re.split(pattern, text) if item!='' and item!=' ']
+
+## Function to get the text of a spec key or value on one line, without the direction marks and the ':' of detail bullets
+def attribute_text(tag):
+    return ' '.join(tag.get_text(' ').replace('\u200e', ' ').replace('\u200f', ' ').split()).strip(' :')
+
+## Function to get the (key, value) pairs of a spec or details block from its structure : th / td cells of the
+## tech-spec and details tables, bold key and sibling value spans of detail bullets ; multi-line values stay one value
+def get_attribute_pairs(tag):
+    pairs = []
+    for row in tag.find_all('tr'):
+        key, value = row.find('th'), row.find('td')
+        if key is not None and value is not None:
+            pairs.append([attribute_text(key), attribute_text(value)])
+    for key in tag.find_all('span', class_='a-text-bold'):
+        value = key.find_next_sibling('span')
+        if value is not None:
+            pairs.append([attribute_text(key), attribute_text(value)])
+    return [[key, value] for key, value in pairs if key != '' and value != '']
+
+## Function to extract the product data from the html of a product page
+def parse_product_page(productPage):
+    productSoup = bs(productPage,'html.parser', parse_only=PRODUCT_STRAINER)
+    tags = collect_product_tags(productSoup)
+    first = lambda keys : next((tags[key] for key in keys if key in tags), None)
+
+    # Product-Name
+    productNames = []
+    if 'productTitle' in tags:
+        productNames = tags['productTitle'].get_text().strip()
+
+    # Offer-Price
+    productDiscountPrice = []
+    tag = first(['priceblock_dealprice', 'priceblock_ourprice', 'tp_price_block_total_price_ww'])
+    if tag is not None:
+        productDiscountPrice = tag.get_text().strip().split('.')[0] + '.00'
+
+    # MRP-Price
+    productActualPrice = []
+    tag = first(['priceBlockStrikePriceString', 'a-text-price'])
+    if tag is not None:
+        productActualPrice = tag.get_text().strip().split('.')[0] + '.00'
+
+    # Product-IMGs
+    productImg = []
+    if 'landingImage' in tags:
+        productImg = json.loads(tags['landingImage']['data-a-dynamic-image'])
+
+    # Product-Rating
+    productRating = []
+    if 'a-icon-alt' in tags:
+        productRating = tags['a-icon-alt'].get_text().strip()
+
+    # Product-Stars
+    productStars = []
+    if 'histogramTable' in tags:
+        productStars = tags['histogramTable'].get_text().replace('\n', '').split('%')
+        productStars = [float(productStars[i][-2:]) for i in range(len(productStars)-1)]
+
+    # Product-Features
+    productFeatures = []
+    if 'feature-bullets' in tags:
+        productFeatures = split_text(tags['feature-bullets'].get_text().strip(), '\n|  ')
+
+    # Product-Specs
+    productSpecs = []
+    productAttributes = []
+    tag = first(['productDetails_techSpec_section_1', 'detailBullets_feature_div'])
+    if tag is not None:
+        productSpecs = split_text(tag.get_text().strip(), '\n|\u200e|  ')
+        productAttributes += get_attribute_pairs(tag)
+    specCount = len(productAttributes)
+
+    # Product-Details
+    productDetails = []
+    if 'productDetails_db_sections' in tags:
+        productDetails = split_text(tags['productDetails_db_sections'].get_text(), '\n|  ')
+        productAttributes += get_attribute_pairs(tags['productDetails_db_sections'])
+
+    context1 = ''
+    for i in range(1, len(productFeatures)-1):
+        context1 = context1 + 'Product has ' + productFeatures[i].replace(' | ', ', ') + '. '
+    
+    ## Spec sentences from the pairs of the spec block, the flat list is not key / value on detail bullets
+    context2 = ''
+    for key, value in productAttributes[:specCount]:
+        context2 = context2 + key + ' is ' + value + '. '
+    
+    details = {
+        'product_data' : {
+            'productNames' : productNames,
+            'productDiscountPrice' : productDiscountPrice,
+            'productActualPrice' : productActualPrice,
+            'productRating' : productRating,
+            'productStars' : productStars,
+            'productImg' : productImg,
+            'productFeatures' : productFeatures,
+            'productSpecs' : productSpecs,
+            'productDetails' : productDetails,
+            'productAttributes' : productAttributes,
+            'context1' : context1, 
+            'context2' : context2 
+        }
+    }
+    return details
+
+## Function to Scrape product related data 
+def scrape_data(productURL):
+    with stage('scrape_data.fetch', url=productURL):
+        productPage = crawler.fetch(productURL)
+    with stage('scrape_data.parse', bytes=len(productPage)):
+        return parse_product_page(productPage)
+
+## Function to Scrape product review data 
+def scrape_reviews( reviewsURL ):
+    with stage('scrape_reviews', url=reviewsURL) as fields:
+        reviewStore = ReviewStore()
+        for reviewsPage in crawler.crawl(reviewsURL):
+            reviewStore.append(reviewsPage.reviews)
+        fields['reviews'] = len(reviewStore)
+    return reviewStore
@@ -0,0 +1,53 @@
+## Importing required Libraries
+import numpy as np
+
+from timing import stage
+
+## Sentiment scoring settings
+BATCH_SIZE = 64
+LENGTH_BUCKETS = (32, 64, 128, 255)
+THRESHOLD = 0.5
+## Reviews rated above this are positive whatever the model says, so they are never scored
+POSITIVE_RATING = 3
+
+## Function to left-pad / left-truncate 'sequences' to 'length' tokens, like pad_sequences' defaults
+def pad_batch(sequences, length):
+    batch = np.zeros((len(sequences), length), dtype=np.int32)
+    for i, sequence in enumerate(sequences):
+        sequence = sequence[-length:]
+        if len(sequence) > 0:
+            batch[i, -len(sequence):] = sequence
+    return batch
+
+## Function to get the 0/1 sentiment of every review, running the model only on reviews the rating does not decide
+def score_reviews(model, tokenizer, texts, ratings, batchSize=BATCH_SIZE, buckets=LENGTH_BUCKETS, threshold=THRESHOLD):
+    preds = (np.asarray(ratings) > POSITIVE_RATING).astype(np.int8)
+    pending = np.flatnonzero(preds == 0)
+    if len(pending) == 0:
+        return preds
+
+    with stage('sentiment.tokenize', reviews=len(pending)):
+        sequences = tokenizer.texts_to_sequences([texts[i] for i in pending])
+    lengths = np.array([len(sequence) for sequence in sequences])
+
+    ## Models with a fixed input length (like the shipped SavedModel) get a single bucket of that length
+    inputLength = model.input_shape[1]
+    bounds = np.array(buckets if inputLength is None else (inputLength,))
+    bucketOf = np.searchsorted(bounds, np.minimum(lengths, bounds[-1]))
+
+    scores = np.empty(len(pending), dtype=np.float32)
+    with stage('sentiment.predict', reviews=len(pending)):
+        for bucket, length in enumerate(bounds):
+            members = np.flatnonzero(bucketOf == bucket)
+            for start in range(0, len(members), batchSize):
+                batch = members[start : start+batchSize]
+                scores[batch] = np.asarray(model.predict_on_batch(pad_batch([sequences[i] for i in batch], int(length)))).reshape(-1)
+
+    preds[pending] = scores >= threshold
+    return preds
+
+## Function to get the share of positive reviews in percent
+def positive_share(preds):
+    if len(preds) == 0:
+        return 0.0
+    return float(np.mean(preds)) * 100
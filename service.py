@@ -0,0 +1,209 @@
+## Headless HTTP API : product, sentiment and answer endpoints, with concurrent questions micro-batched into one forward pass
+## RUN : python service.py [--port 8080] [--max-batch-size 16] [--max-wait-ms 10]
+import json
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from registry import registry
+from product_cache import get_product_id, get_product, get_reviews
+from qna import answer_questions, product_contexts, lookup_answer, prepare_inputs, finish_answer
+from sentiment import score_reviews, positive_share
+from retrieval import get_passage_index, build_passage_index
+from specs import get_attribute_index
+from answer_cache import answerCache
+from timing import recorder, stage
+
+MAX_BATCH_SIZE = 16
+MAX_WAIT = 0.01
+
+## Scheduler gathering the questions that arrive within 'maxWait' seconds (up to 'maxBatchSize') into one padded batch
+class MicroBatcher:
+    def __init__(self, maxBatchSize=MAX_BATCH_SIZE, maxWait=MAX_WAIT):
+        self.maxBatchSize = maxBatchSize
+        self.maxWait = maxWait
+        self.queue = asyncio.Queue()
+        ## One inference thread : batches run one after another, torch uses all cores for each
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='qna-batch')
+
+    async def answer(self, question, contexts):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((question, contexts, future))
+        return await future
+
+    async def next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.maxWait
+        while len(batch) < self.maxBatchSize:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.next_batch()
+            try:
+                model = await loop.run_in_executor(self.executor, registry.get, 'qna_model')
+                tokenizer = await loop.run_in_executor(self.executor, registry.get, 'qna_tokenizer')
+                answers = await loop.run_in_executor(self.executor, answer_questions, model, tokenizer, [(question, contexts) for question, contexts, future in batch])
+                for (question, contexts, future), answer in zip(batch, answers):
+                    if not future.done():
+                        future.set_result(answer)
+            except Exception as error:
+                for question, contexts, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+
+## HTTP error with a status code, sent back as {"error": message}
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class Service:
+    def __init__(self, maxBatchSize=MAX_BATCH_SIZE, maxWait=MAX_WAIT):
+        self.batcher = MicroBatcher(maxBatchSize, maxWait)
+        ## Scraping, spell correction and tokenization run here, off the event loop
+        self.executor = ThreadPoolExecutor(thread_name_prefix='service')
+        self.routes = {
+            ('GET', '/status') : self.status,
+            ('GET', '/timings') : self.timings,
+            ('POST', '/product') : self.product,
+            ('POST', '/sentiment') : self.sentiment,
+            ('POST', '/answer') : self.answer,
+        }
+
+    async def call(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def status(self, request):
+        return dict(registry.status(), answerCache=answerCache.stats())
+
+    ## Per-stage count, latency percentiles and memory growth of the recent requests
+    async def timings(self, request):
+        return recorder.summary()
+
+    async def product(self, request):
+        return (await self.call(get_product, require(request, 'url')))['product_data']
+
+    def score_sentiment(self, productURL):
+        with stage('sentiment', productID=get_product_id(productURL)):
+            reviews = get_reviews(productURL)
+            preds = score_reviews(registry.get('sentiment_model'), registry.get('sentiment_tokenizer'), reviews.reviews, reviews.ratings)
+        return {'positive' : positive_share(preds), 'reviews' : len(preds)}
+
+    async def sentiment(self, request):
+        return await self.call(self.score_sentiment, require(request, 'url'))
+
+    ## Function to get (product ID, None, batcher input) for the micro-batcher, or (product ID, answer, None) for spec and cached questions,
+    ## through the same prepare steps as qna_bert ; reviews are only crawled for questions the model reads
+    def prepare_question(self, request):
+        question = require(request, 'question')
+        if not isinstance(question, str):
+            raise HTTPError(400, '"question" must be a string')
+        useCache = request.get('cache', True)
+        if 'contexts' in request:
+            contexts, productID = request['contexts'], request.get('productID')
+            ## A bare string would be read one character per context
+            if not isinstance(contexts, list) or not all(isinstance(context, str) for context in contexts):
+                raise HTTPError(400, '"contexts" must be a list of strings')
+            answer = lookup_answer(question, productID, None, useCache)
+            if answer is not None:
+                return productID, answer, None
+            return productID, None, prepare_inputs(contexts, question, productID)
+
+        productURL = require(request, 'url')
+        productID = get_product_id(productURL)
+        product_data = get_product(productURL)['product_data']
+        answer = lookup_answer(question, productID, get_attribute_index(productID, product_data), useCache)
+        if answer is not None:
+            return productID, answer, None
+        passageIndex = get_passage_index(productID, lambda : build_passage_index(product_data, get_reviews(productURL).reviews))
+        return productID, None, prepare_inputs(product_contexts(product_data), question, productID, passageIndex)
+
+    ## Answer from the product 'url', or from the given 'contexts', skipping the answer cache when 'cache' is false
+    async def answer(self, request):
+        productID, answer, inputs = await self.call(self.prepare_question, request)
+        if answer is None:
+            result = await self.batcher.answer(*inputs)
+            answer = finish_answer(result, request['question'], productID, request.get('cache', True))
+        return {'question' : answer['question'], 'answer' : answer['answer'], 'score' : answer['score']}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                requestLine = await reader.readline()
+                if not requestLine:
+                    break
+                method, path, version = requestLine.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = (await reader.readline()).decode('latin-1').strip()
+                    if line == '':
+                        break
+                    key, value = line.split(':', 1)
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, response = 200, None
+                try:
+                    route = self.routes.get((method, path.split('?')[0]))
+                    if route is None:
+                        raise HTTPError(404, f'no route for {method} {path}')
+                    try:
+                        request = json.loads(body) if body else {}
+                    except ValueError:
+                        raise HTTPError(400, 'body is not JSON')
+                    response = await route(request)
+                except HTTPError as error:
+                    status, response = error.status, {'error' : str(error)}
+                except Exception as error:
+                    status, response = 500, {'error' : repr(error)}
+
+                payload = json.dumps(response).encode('utf-8')
+                keepAlive = headers.get('connection', '').lower() != 'close'
+                writer.write(f'HTTP/1.1 {status} {"OK" if status == 200 else "Error"}\r\nContent-Type: application/json\r\nContent-Length: {len(payload)}\r\nConnection: {"keep-alive" if keepAlive else "close"}\r\n\r\n'.encode('latin-1') + payload)
+                await writer.drain()
+                if not keepAlive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        registry.warm_up()
+        batcher = asyncio.ensure_future(self.batcher.run())
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f'eSeller API on http://{host}:{port}')
+        async with server:
+            try:
+                await server.serve_forever()
+            finally:
+                batcher.cancel()
+
+## Function to get a required field of a request
+def require(request, key):
+    if key not in request:
+        raise HTTPError(400, f'missing "{key}"')
+    return request[key]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT * 1000)
+    args = parser.parse_args()
+
+    ## The service (and its queue) is created inside the running loop
+    async def main():
+        await Service(args.max_batch_size, args.max_wait_ms / 1000).serve(args.host, args.port)
+    asyncio.run(main())
@@ -0,0 +1,138 @@
+## Importing required Libraries
+import re
+import difflib
+import threading
+from collections import OrderedDict
+
+from text import normalize
+
+## Attribute lookup settings
+MIN_CONFIDENCE = 0.8
+FUZZY_CUTOFF = 0.8
+MAX_CACHED_INDEXES = 256
+## Lines of the details block that are section titles, not keys
+HEADINGS = set(['additional information', 'technical details', 'product information', 'feedback'])
+## Questions starting with these ask yes / no ('is it made in india'), a spec value is not their answer
+YES_NO_WORDS = set('is are was were does do did can could will would should has have'.split())
+## Other ways customers name a spec key : specific words or phrases without stop words, so that no alias
+## collapses to a generic token once normalized (like 'made in' and 'made by' both becoming 'made')
+KEY_ALIASES = {
+    'item weight' : ['weight', 'heavy'],
+    'battery power rating' : ['battery capacity', 'mah'],
+    'battery life' : ['battery backup', 'battery hours'],
+    'colour' : ['color'],
+    'item model number' : ['model number'],
+    'product dimensions' : ['dimensions'],
+    'standing screen display size' : ['screen size', 'display size'],
+    'display size' : ['screen size'],
+    'ram' : ['memory'],
+    'ram memory installed size' : ['ram'],
+    'connectivity technologies' : ['connectivity'],
+    'country of origin' : ['origin', 'country'],
+    'manufacturer' : ['maker', 'manufactured'],
+    'net quantity' : ['quantity', 'pieces'],
+    'included components' : ['box contents', 'included'],
+}
+
+## Keys of the spec and details blocks other than KEY_ALIASES, used to tell keys from values in the flat lists
+KNOWN_KEYS = set(['brand', 'model name', 'model year', 'asin', 'customer reviews', 'best sellers rank', 'date first available', 'packer', 'importer',
+    'item part number', 'generic name', 'os', 'operating system', 'form factor', 'special features', 'other display features', 'wireless carrier',
+    'item dimensions lxwxh', 'device interface primary', 'other camera features', 'audio jack', 'whats in the box', 'cellular technology'])
+## Tokens of the flat lists that are neither keys nor values : detail bullet separators and direction marks
+SEPARATORS = set([':', '\u200e', '\u200f'])
+
+## Function to tell whether a text of the flat spec / detail lists is a key name
+def is_key(text):
+    text = ' '.join(re.findall(r'[a-z0-9]+', text.lower()))
+    return text in KNOWN_KEYS or text in KEY_ALIASES
+
+## Function to pair the items of a flat key / value list, skipping items followed by a key instead of their value
+## (the extra lines of a multi-line value)
+def pair_items(items):
+    items = [item.strip(''.join(SEPARATORS) + ' ') for item in items if item.strip() not in SEPARATORS]
+    items = [item for item in items if item != '' and item.lower() not in HEADINGS]
+    pairs = []
+    i = 0
+    while i < len(items) - 1:
+        if is_key(items[i+1]):
+            i += 1
+            continue
+        pairs.append((items[i], items[i+1]))
+        i += 2
+    return pairs
+
+## Function to get the (key, value) pairs of a product : the pairs the parser read from the page structure,
+## or for products cached before it kept them, the flat spec and detail lists paired up
+def get_attributes(product_data):
+    if 'productAttributes' in product_data:
+        return [(key, value) for key, value in product_data['productAttributes']]
+    return pair_items(product_data['productSpecs']) + pair_items(product_data['productDetails'])
+
+## Per-product attribute index : normalized keys and their aliases, looked up by exact or fuzzy token match
+class AttributeIndex:
+    def __init__(self, pairs):
+        self.keys = []
+        for key, value in pairs:
+            for name in [key] + KEY_ALIASES.get(' '.join(re.findall(r'[a-z0-9]+', key.lower())), []):
+                tokens = tuple(dict.fromkeys(normalize(name)))
+                ## Aliases that lose words to normalization would match far more questions than they name
+                if len(tokens) == 0 or (name != key and len(tokens) < len(name.split())):
+                    continue
+                self.keys.append((tokens, key, value))
+        self.vocabulary = set(token for tokens, key, value in self.keys for token in tokens)
+        self.sortedVocabulary = sorted(self.vocabulary)
+        self.fuzzy = {}
+        self.lock = threading.Lock()
+
+    ## Function to map a question token to a key token, correcting near misses like 'wieght'
+    def match_token(self, token):
+        if token in self.fuzzy:
+            return self.fuzzy[token]
+        matches = difflib.get_close_matches(token, self.sortedVocabulary, n=1, cutoff=FUZZY_CUTOFF)
+        match = matches[0] if len(matches) > 0 and len(token) > 3 else None
+        with self.lock:
+            self.fuzzy[token] = match
+        return match
+
+    ## Function to answer the 'question' from the spec values, None when no key matches with enough confidence
+    def lookup(self, question, minConfidence=MIN_CONFIDENCE):
+        words = question.lower().split()
+        if len(words) == 0 or words[0] in YES_NO_WORDS:
+            return None
+        tokens = set()
+        for token in normalize(question):
+            tokens.add(token if token in self.vocabulary else (self.match_token(token) or token))
+
+        best = None
+        for keyTokens, key, value in self.keys:
+            matched = sum(1 for token in keyTokens if token in tokens)
+            if matched == 0:
+                continue
+            ## Share of the key that is asked for, times the share of the question words the key explains
+            confidence = matched / len(keyTokens) * matched / len(tokens)
+            if best is None or (confidence, matched) > (best['score'], best['matched']):
+                best = {'answer' : value, 'key' : key, 'score' : confidence, 'matched' : matched}
+
+        if best is None or best['score'] < minConfidence:
+            return None
+        return best
+
+## Function to build the attribute index of a product
+def build_attribute_index(product_data):
+    return AttributeIndex(get_attributes(product_data))
+
+## Process-wide LRU of attribute indexes by product ID
+attributeIndexes = OrderedDict()
+attributeIndexesLock = threading.Lock()
+
+def get_attribute_index(productID, product_data):
+    with attributeIndexesLock:
+        if productID in attributeIndexes:
+            attributeIndexes.move_to_end(productID)
+            return attributeIndexes[productID]
+    attributeIndex = build_attribute_index(product_data)
+    with attributeIndexesLock:
+        attributeIndexes[productID] = attributeIndex
+        if len(attributeIndexes) > MAX_CACHED_INDEXES:
+            attributeIndexes.popitem(last=False)
+    return attributeIndex
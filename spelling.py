@@ -0,0 +1,162 @@
+## Importing required Libraries
+import os
+import re
+import hashlib
+import threading
+import importlib.util
+from collections import OrderedDict
+
+## Symmetric-delete (SymSpell) spell correction settings
+MAX_EDIT_DISTANCE = 2
+PREFIX_LENGTH = 7
+CACHE_SIZE = 4096
+MAX_CACHED_CORRECTORS = 64
+## Count given to product terms so they win over dictionary words at the same edit distance
+PRODUCT_TERM_COUNT = 10**9
+
+## Function to get the word frequencies shipped with TextBlob, the same corpus TextBlob(word).correct() searches,
+## located without importing TextBlob (and NLTK)
+def get_corpus_path():
+    return os.path.join(os.path.dirname(importlib.util.find_spec('textblob').origin), 'en', 'en-spelling.txt')
+
+## Function to get every string reachable from 'word' with at most 'maxDistance' deletes
+def get_deletes(word, maxDistance):
+    deletes = {word}
+    queue = [word]
+    for _ in range(maxDistance):
+        nextQueue = []
+        for item in queue:
+            for i in range(len(item)):
+                delete = item[:i] + item[i+1:]
+                if delete not in deletes:
+                    deletes.add(delete)
+                    nextQueue.append(delete)
+        queue = nextQueue
+    return deletes
+
+## Function to get the Damerau-Levenshtein distance of 'a' and 'b', or maxDistance+1 once it is exceeded
+def edit_distance(a, b, maxDistance):
+    if abs(len(a) - len(b)) > maxDistance:
+        return maxDistance + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i-1] == b[j-1] else 1
+            current[j] = min(previous[j] + 1, current[j-1] + 1, previous[j-1] + cost)
+            if i > 1 and j > 1 and a[i-1] == b[j-2] and a[i-2] == b[j-1]:
+                current[j] = min(current[j], previous2[j-2] + 1)
+        if min(current) > maxDistance:
+            return maxDistance + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+## Precomputed index from every delete of a word's prefix to the words that produce it
+class SymSpellIndex:
+    def __init__(self, maxEditDistance=MAX_EDIT_DISTANCE, prefixLength=PREFIX_LENGTH):
+        self.maxEditDistance = maxEditDistance
+        self.prefixLength = prefixLength
+        self.words = {}
+        self.deletes = {}
+
+    def add_word(self, word, count=1):
+        if word in self.words:
+            self.words[word] = max(self.words[word], count)
+            return
+        self.words[word] = count
+        for delete in get_deletes(word[:self.prefixLength], self.maxEditDistance):
+            self.deletes.setdefault(delete, []).append(word)
+
+    ## Function to get (word, distance, count) of every indexed word within maxEditDistance of 'word'
+    def lookup(self, word):
+        suggestions = []
+        seen = set()
+        for delete in get_deletes(word[:self.prefixLength], self.maxEditDistance):
+            for candidate in self.deletes.get(delete, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = edit_distance(word, candidate, self.maxEditDistance)
+                if distance <= self.maxEditDistance:
+                    suggestions.append((candidate, distance, self.words[candidate]))
+        return suggestions
+
+## Function to build the dictionary index from the TextBlob word-frequency corpus
+def load_corpus_index(path=None):
+    path = path or get_corpus_path()
+    index = SymSpellIndex()
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            parts = line.split()
+            if len(parts) != 2 or line.startswith(';') or not parts[1].isdigit():
+                continue
+            index.add_word(parts[0].lower(), int(parts[1]))
+    return index
+
+## Function to get all words of the product 'texts' that should never be corrected away
+def get_product_terms(texts):
+    terms = set()
+    for text in texts:
+        terms.update(re.findall(r'[a-z]+', text.lower()))
+    return terms
+
+## Spell corrector over the shared dictionary index plus a small index of product terms
+class SpellCorrector:
+    def __init__(self, baseIndex, terms=(), cacheSize=CACHE_SIZE):
+        self.baseIndex = baseIndex
+        self.productIndex = SymSpellIndex(baseIndex.maxEditDistance, baseIndex.prefixLength)
+        for term in terms:
+            self.productIndex.add_word(term, PRODUCT_TERM_COUNT)
+        self.cacheSize = cacheSize
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def correct_word(self, word):
+        with self.lock:
+            if word in self.cache:
+                self.cache.move_to_end(word)
+                return self.cache[word]
+
+        corrected = word
+        ## Numbers and model codes like 'c01' or 'usb3' are left untouched
+        if word.isalpha() and word not in self.productIndex.words and word not in self.baseIndex.words:
+            suggestions = self.productIndex.lookup(word) + self.baseIndex.lookup(word)
+            if len(suggestions) > 0:
+                corrected = min(suggestions, key=lambda suggestion: (suggestion[1], -suggestion[2]))[0]
+
+        with self.lock:
+            self.cache[word] = corrected
+            if len(self.cache) > self.cacheSize:
+                self.cache.popitem(last=False)
+        return corrected
+
+    def correct(self, text):
+        return " ".join(self.correct_word(word) for word in text.split())
+
+## Process-wide dictionary index and per-product correctors, built on first use
+baseIndex = None
+correctors = OrderedDict()
+correctorsLock = threading.Lock()
+
+def get_base_index():
+    global baseIndex
+    with correctorsLock:
+        if baseIndex is None:
+            baseIndex = load_corpus_index()
+        return baseIndex
+
+## Function to get the corrector seeded with the terms of the product 'productID'
+def get_corrector(productID=None, texts=()):
+    index = get_base_index()
+    key = (productID, hashlib.sha1("\n".join(texts).encode('utf-8')).hexdigest())
+    with correctorsLock:
+        if key in correctors:
+            correctors.move_to_end(key)
+            return correctors[key]
+    corrector = SpellCorrector(index, get_product_terms(texts))
+    with correctorsLock:
+        correctors[key] = corrector
+        if len(correctors) > MAX_CACHED_CORRECTORS:
+            correctors.popitem(last=False)
+    return corrector
@@ -0,0 +1,16 @@
+## Importing required Libraries
+import re
+
+## Words that never change what a question asks or a spec key names, shared by the spec index, the answer cache and retrieval
+STOP_WORDS = set('a an and are as at be by can do does for from has have how i in is it its me my much many of on or the this to was what which who will with you product item'.split())
+
+## Function to get the normalized word tokens of a question or key : lowercase words without 'stopWords' and without the plural 's'
+def normalize(text, stopWords=STOP_WORDS):
+    words = []
+    for word in re.findall(r'[a-z0-9]+', text.lower()):
+        if word in stopWords:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        words.append(word)
+    return words
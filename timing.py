@@ -0,0 +1,124 @@
+## Importing required Libraries
+import os
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from registry import process_bytes
+
+## Instrumentation settings, overridable through the environment
+TIMING_ENABLED = os.environ.get('ESELLER_TIMING', '1') == '1'
+## JSON lines file every record is appended to, none by default
+TIMING_LOG = os.environ.get('ESELLER_TIMING_LOG')
+MAX_RECORDS = int(os.environ.get('ESELLER_TIMING_MAX_RECORDS', 10000))
+## Reading the RSS costs more than the short stages it would measure : it is sampled on the coarse stages below,
+## and on every stage only with ESELLER_TIMING_MEMORY=1
+TIMING_MEMORY = os.environ.get('ESELLER_TIMING_MEMORY', '0') == '1'
+MEMORY_STAGES = set(['scrape_data.fetch', 'scrape_data.parse', 'scrape_reviews', 'sentiment', 'sentiment.predict', 'qna.forward'])
+
+## Sink appending every record as one JSON line to 'path'
+class JsonLogSink:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def __call__(self, record):
+        line = json.dumps(record) + '\n'
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as handle:
+                handle.write(line)
+
+## Process-wide recorder of stage timings : keeps the last 'maxRecords' records and passes every record to the sinks
+class StageRecorder:
+    def __init__(self, enabled=TIMING_ENABLED, maxRecords=MAX_RECORDS, memory=TIMING_MEMORY, memoryStages=MEMORY_STAGES):
+        self.enabled = enabled
+        self.memory = memory
+        self.memoryStages = memoryStages
+        self.records = deque(maxlen=maxRecords)
+        self.sinks = []
+        self.lock = threading.Lock()
+
+    ## Function to add a sink, any callable taking a record dict (a JSON log, a statsd or Prometheus client, ...)
+    def add_sink(self, sink):
+        with self.lock:
+            self.sinks.append(sink)
+
+    def remove_sink(self, sink):
+        with self.lock:
+            self.sinks.remove(sink)
+
+    def record(self, record):
+        with self.lock:
+            self.records.append(record)
+            sinks = list(self.sinks)
+        for sink in sinks:
+            sink(record)
+
+    ## Context manager timing the block as stage 'name', 'fields' (product ID, batch size, ...) are kept in the record
+    @contextmanager
+    def stage(self, name, **fields):
+        if not self.enabled:
+            yield fields
+            return
+        sampleMemory = self.memory or name in self.memoryStages
+        startTime = time.time()
+        startBytes = process_bytes() if sampleMemory else None
+        start = time.perf_counter()
+        error = None
+        try:
+            yield fields
+        except BaseException as exception:
+            error = repr(exception)
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            record = dict(fields, stage=name, start=startTime, seconds=seconds, thread=threading.current_thread().name)
+            if sampleMemory:
+                endBytes = process_bytes()
+                record['rssBytes'], record['rssDeltaBytes'] = endBytes, endBytes - startBytes
+            if error is not None:
+                record['error'] = error
+            self.record(record)
+
+    def get_records(self, stage=None):
+        with self.lock:
+            return [record for record in self.records if stage is None or record['stage'] == stage]
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+
+    ## Function to get the count, total, mean, p50, p95 and max seconds of every stage, plus its largest memory growth when sampled
+    def summary(self):
+        stages = {}
+        for record in self.get_records():
+            stages.setdefault(record['stage'], []).append(record)
+        summary = {}
+        for name, records in sorted(stages.items()):
+            seconds = sorted(record['seconds'] for record in records)
+            summary[name] = {
+                'count' : len(seconds),
+                'totalSeconds' : sum(seconds),
+                'meanSeconds' : sum(seconds) / len(seconds),
+                'p50Seconds' : seconds[len(seconds) // 2],
+                'p95Seconds' : seconds[min(len(seconds)-1, int(len(seconds) * 0.95))],
+                'maxSeconds' : seconds[-1],
+                'maxRssDeltaBytes' : max((record['rssDeltaBytes'] for record in records if 'rssDeltaBytes' in record), default=None),
+            }
+        return summary
+
+    ## Function to write the kept records to 'path' as JSON lines
+    def export_json(self, path):
+        with open(path, 'w', encoding='utf-8') as handle:
+            for record in self.get_records():
+                handle.write(json.dumps(record) + '\n')
+
+recorder = StageRecorder()
+if TIMING_LOG:
+    recorder.add_sink(JsonLogSink(TIMING_LOG))
+
+## Shortcut to time a block with the process-wide recorder : with stage('qna.forward', windows=12): ...
+def stage(name, **fields):
+    return recorder.stage(name, **fields)